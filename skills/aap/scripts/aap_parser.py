@@ -10,9 +10,12 @@ Requires: pip install tree-sitter tree-sitter-markdown
 """
 
 import argparse
+import bisect
+import functools
 import re
 import sys
 import warnings
+from collections import Counter, defaultdict
 from dataclasses import dataclass, field
 from pathlib import Path
 
@@ -26,11 +29,11 @@ warnings.filterwarnings("ignore", category=FutureWarning, module="tree_sitter")
 # ---------------------------------------------------------------------------
 
 _LANGUAGES: dict[str, Language] = {}
-_PARSERS: dict[str, Parser] = {}
 
 
+@functools.lru_cache(maxsize=None)
 def _load_languages():
-    """Load the tree-sitter-markdown language."""
+    """Load the tree-sitter-markdown language (once; later calls are no-ops)."""
     loaders = {
         "markdown": ("tree_sitter_markdown", "language"),
     }
@@ -48,21 +51,60 @@ def _load_languages():
             )
 
 
-def get_parser(lang: str) -> Parser | None:
-    """Get a parser for the given language."""
-    if lang not in _PARSERS:
-        if lang not in _LANGUAGES:
-            return None
-        p = Parser(_LANGUAGES[lang])
-        _PARSERS[lang] = p
-    return _PARSERS[lang]
+# ---------------------------------------------------------------------------
+# Patterns
+# ---------------------------------------------------------------------------
+
+# Heading number prefix: "0", "0.7", "0.7.1"
+_NUM_PREFIX_RE = re.compile(r"^(\d+(?:\.\d+)*)")
+# Numbered heading title: "0. Intro", "0.2.1 Scope" -> (number, title)
+_NUM_TITLE_RE = re.compile(r"^(\d+(?:\.\d+)*\.?)\s+(.+)$")
+# Any line whose first non-blank character is "#" (section lookup)
+_HASH_LINE_RE = re.compile(r"^[^\S\n]*#(.*)$", re.MULTILINE)
+# Code fence opener with its info string (fallback parser)
+_FENCE_LINE_RE = re.compile(r"^[^\S\n]*```(.*)$", re.MULTILINE)
+# ATX heading line (fallback parser)
+_HEADING_LINE_RE = re.compile(r"^(#{1,6})[^\S\n]+(.+)$", re.MULTILINE)
+# File table row with an explicit action column (fallback parser). Scanned
+# over whole text, so no part of the pattern may cross a newline.
+_FALLBACK_TABLE_RE = re.compile(
+    r"^\|[^\S\n]*`?([^|`\n]+?)`?[^\S\n]*\|[^\S\n]*(CREATE|MODIFY|UPDATE|REFERENCE|DELETE)"
+    r"[^\S\n]*\|[^\S\n]*(.+?)[^\S\n]*\|",
+    re.MULTILINE,
+)
+# Section-heading keywords that imply a file action when a table has no
+# action column, in priority order
+_ACTION_KEYWORDS: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("DELETE", ("delete", "removed", "deprecated")),
+    ("MODIFY", ("modify", "modif", "existing", "requiring modification", "touchpoint",
+                "updates", "update", "integration point")),
+    ("CREATE", ("new", "create", "new file", "requirements")),
+    ("REFERENCE", ("reference", "searched", "cross-reference", "discovered", "discovery")),
+)
+# One lookahead per action anchored at position 0: alternatives are tried in
+# order and each scans the whole title, so priority (not keyword position)
+# decides the winner. match.lastgroup is the action.
+_ACTION_KEYWORD_RE = re.compile(
+    "|".join(
+        f"(?=.*?(?:{'|'.join(map(re.escape, keywords))}))(?P<{action}>)"
+        for action, keywords in _ACTION_KEYWORDS
+    ),
+    re.DOTALL,
+)
+# C source file / directory references used to enrich file entries
+_SOURCE_FILE_REF_RE = re.compile(r"([a-zA-Z_][\w.-]*\.[ch])")
+_SOURCE_DIR_REF_RE = re.compile(r"([a-zA-Z_][\w.-]*/)")
+
+# Line breaks that str.splitlines() honours besides "\n" and "\r\n"
+_OTHER_LINE_BREAK_RE = re.compile("\r(?!\n)|[\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+_NEWLINE_BYTES_RE = re.compile(rb"\n")
 
 
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class AAPConfig:
     """Configuration for AAP parsing and LoC estimation."""
     file_path: str = ""
@@ -76,7 +118,7 @@ class AAPConfig:
 # Data classes
 # ---------------------------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class HeadingNode:
     """A section heading in the AAP hierarchy."""
     level: int
@@ -86,7 +128,7 @@ class HeadingNode:
     children: list["HeadingNode"] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class FileEntry:
     """A file from the repository scope tables."""
     path: str
@@ -97,7 +139,7 @@ class FileEntry:
     source_lines: int = 0  # extracted/enriched from source line counts
 
 
-@dataclass
+@dataclass(slots=True)
 class DependencyEntry:
     """A dependency from the dependency inventory tables."""
     registry: str
@@ -106,7 +148,7 @@ class DependencyEntry:
     purpose: str
 
 
-@dataclass
+@dataclass(slots=True)
 class RuleEntry:
     """A rule extracted from section 0.7."""
     section_number: str
@@ -114,14 +156,14 @@ class RuleEntry:
     constraints: list[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class ScopeItem:
     """An in-scope or out-of-scope item from section 0.6."""
     description: str
     in_scope: bool = True
 
 
-@dataclass
+@dataclass(slots=True)
 class AAPDocument:
     """Aggregated data extracted from an AAP document."""
     headings: list[HeadingNode] = field(default_factory=list)
@@ -133,64 +175,173 @@ class AAPDocument:
     mermaid_diagrams: int = 0
     code_blocks: int = 0
     total_lines: int = 0
+    action_counts: Counter = field(default_factory=Counter)  # action → number of files
+
+    def add_file(self, entry: FileEntry) -> None:
+        """Append a file entry, keeping the per-action counts in sync."""
+        self.files.append(entry)
+        self.action_counts[entry.action] += 1
 
     @property
     def create_count(self) -> int:
-        return sum(1 for f in self.files if f.action == "CREATE")
+        return self.action_counts["CREATE"]
 
     @property
     def modify_count(self) -> int:
-        return sum(1 for f in self.files if f.action == "MODIFY")
+        return self.action_counts["MODIFY"]
 
     @property
     def reference_count(self) -> int:
-        return sum(1 for f in self.files if f.action == "REFERENCE")
+        return self.action_counts["REFERENCE"]
 
     @property
     def delete_count(self) -> int:
-        return sum(1 for f in self.files if f.action == "DELETE")
+        return self.action_counts["DELETE"]
 
     @property
     def major_sections(self) -> int:
         return len([h for h in self.headings if h.level == 1])
 
 
+@dataclass(slots=True)
+class FileLocSummary:
+    """Per-file LoC estimates and their aggregates, gathered in one pass."""
+    file_locs: list[tuple[FileEntry, int]] = field(default_factory=list)
+    loc_by_action: Counter = field(default_factory=Counter)  # action → estimated LoC
+    total_loc: int = 0
+    source_informed: int = 0  # CREATE files estimated from source line counts
+    total_source_lines: int = 0
+    layers: dict[str, list[int]] = field(default_factory=dict)  # layer → [CREATE, MODIFY, LoC]
+
+
+class LineBuffer:
+    """Read-only, line-indexed view over UTF-8 source bytes.
+
+    Only line offsets are stored; a line is decoded when it is indexed, so
+    visitors that read a few sections never hold a second copy of the file.
+    Rows follow tree-sitter's numbering (one per "\n").
+    """
+
+    __slots__ = ("data", "line_starts")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        starts = [0]
+        starts.extend(m.end() for m in _NEWLINE_BYTES_RE.finditer(data))
+        # A trailing newline does not start another line (as with splitlines)
+        if starts[-1] == len(data):
+            starts.pop()
+        self.line_starts = starts
+
+    def __len__(self) -> int:
+        return len(self.line_starts)
+
+    def __getitem__(self, i: int) -> str:
+        start = self.line_starts[i]
+        end = self.line_starts[i + 1] - 1 if i + 1 < len(self.line_starts) else len(self.data)
+        line = self.data[start:end]
+        if line.endswith(b"\n"):
+            line = line[:-1]
+        if line.endswith(b"\r"):
+            line = line[:-1]
+        return line.decode("utf-8")
+
+
+@dataclass(slots=True)
+class ParseContext:
+    """Per-parse state shared by visitors during AST traversal."""
+    source_lines: LineBuffer | list[str]
+    # Rows of "#" lines (ascending) and their titles; see _index_sections
+    section_rows: list[int] = field(default_factory=list)
+    section_titles: list[str] = field(default_factory=list)
+    text_cache: dict[int, str] = field(default_factory=dict)  # node id -> decoded text
+    heading_stack: list[HeadingNode] = field(default_factory=list)  # open ancestors of the next heading
+
+    def text(self, node) -> str:
+        """Return the node's UTF-8 text, decoding each node at most once per parse."""
+        text = self.text_cache.get(node.id)
+        if text is None:
+            text = node.text.decode("utf-8")
+            self.text_cache[node.id] = text
+        return text
+
+
+def _index_sections(source: str) -> tuple[list[int], list[str]]:
+    """Return the rows of heading-like lines and their titles, in source order.
+
+    Candidate lines are located with one regex scan over the whole source
+    rather than stripping every line; rows are counted by newlines, matching
+    tree-sitter's row numbering. Only heading rows are stored, so memory
+    scales with the number of headings rather than the number of lines; the
+    nearest heading for any row is found by bisection.
+    """
+    rows: list[int] = []
+    titles: list[str] = []
+    row = 0
+    pos = 0
+    for m in _HASH_LINE_RE.finditer(source):
+        row += source.count("\n", pos, m.start())
+        pos = m.start()
+        rows.append(row)
+        titles.append(m.group(1).lstrip("#").strip())
+    return rows, titles
+
+
+def _section_heading(section_node, ctx: ParseContext) -> tuple[object | None, str, str]:
+    """Return (heading node, number prefix, heading text) for a section node.
+
+    The number is the leading "0.7.1"-style prefix of the heading text, or ""
+    when the heading is unnumbered.
+    """
+    for child in section_node.children:
+        if child.type == "atx_heading":
+            for sub in child.children:
+                if sub.type == "inline":
+                    text = ctx.text(sub).strip()
+                    match = _NUM_PREFIX_RE.match(text)
+                    return child, match.group(1) if match else "", text
+            return child, "", ""
+    return None, "", ""
+
+
 # ---------------------------------------------------------------------------
 # Node Visitors
 # ---------------------------------------------------------------------------
 
 class NodeVisitor:
-    """Base class for markdown AST node visitors."""
+    """Base class for markdown AST node visitors.
+
+    Subclasses declare the node types they handle in ``node_types``; the
+    parser only dispatches matching nodes to ``visit``.
+    """
+
+    node_types: tuple[str, ...] = ()
 
     def __init__(self, config: AAPConfig):
         self.config = config
 
-    def visit(self, node, doc: AAPDocument, source_lines: list[str]) -> None:
+    def visit(self, node, doc: AAPDocument, ctx: ParseContext) -> None:
         """Visit a node and optionally extract data."""
 
 
 class HeadingVisitor(NodeVisitor):
     """Builds numbered section hierarchy from atx_heading nodes."""
 
-    # Match AAP heading numbers like "0.", "0.1", "0.1.1", "0.2.3"
-    _NUMBER_RE = re.compile(r"^(\d+(?:\.\d+)*\.?)\s+(.+)$")
-
-    def visit(self, node, doc: AAPDocument, source_lines: list[str]) -> None:
-        if node.type != "atx_heading":
-            return
+    node_types = ("atx_heading",)
 
+    def visit(self, node, doc: AAPDocument, ctx: ParseContext) -> None:
         level = 0
         title_text = ""
         for child in node.children:
             if child.type.startswith("atx_h") and child.type.endswith("_marker"):
-                level = len(child.text.decode("utf-8").strip())
+                level = len(ctx.text(child).strip())
             elif child.type == "inline":
-                title_text = child.text.decode("utf-8").strip()
+                title_text = ctx.text(child).strip()
 
         if not title_text or level == 0:
             return
 
-        match = self._NUMBER_RE.match(title_text)
+        match = _NUM_TITLE_RE.match(title_text)
         if match:
             number = match.group(1).rstrip(".")
             title = match.group(2).strip()
@@ -206,15 +357,22 @@ class HeadingVisitor(NodeVisitor):
         )
         doc.headings.append(heading)
 
+        # Headings arrive in source order, so nest them as they are seen
+        stack = ctx.heading_stack
+        while stack and stack[-1].level >= level:
+            stack.pop()
+        if stack:
+            stack[-1].children.append(heading)
+        stack.append(heading)
+
 
 class TableVisitor(NodeVisitor):
     """Extracts File|Action|Purpose and dependency tables from pipe_table nodes."""
 
-    def visit(self, node, doc: AAPDocument, source_lines: list[str]) -> None:
-        if node.type != "pipe_table":
-            return
+    node_types = ("pipe_table",)
 
-        header_cells = self._get_row_cells(node, "pipe_table_header")
+    def visit(self, node, doc: AAPDocument, ctx: ParseContext) -> None:
+        header_cells = self._get_row_cells(node, "pipe_table_header", ctx)
         if not header_cells:
             return
 
@@ -222,10 +380,10 @@ class TableVisitor(NodeVisitor):
 
         # Detect file tables (File|Action|Purpose)
         if self._is_file_table(header_lower):
-            self._extract_file_entries(node, header_lower, doc, source_lines)
+            self._extract_file_entries(node, header_lower, doc, ctx)
         # Detect dependency tables (Registry|Package|Version|Purpose)
         elif self._is_dep_table(header_lower):
-            self._extract_dep_entries(node, header_lower, doc)
+            self._extract_dep_entries(node, header_lower, doc, ctx)
 
     def _is_file_table(self, headers: list[str]) -> bool:
         # Check if any header contains "file" as a word (handles "Target File", "File Path", etc.)
@@ -241,19 +399,32 @@ class TableVisitor(NodeVisitor):
     def _is_dep_table(self, headers: list[str]) -> bool:
         return "registry" in headers and "package" in headers
 
-    def _get_row_cells(self, table_node, row_type: str) -> list[str]:
+    def _get_row_cells(self, table_node, row_type: str, ctx: ParseContext) -> list[str]:
         """Extract cell text from a table row."""
         for child in table_node.children:
             if child.type == row_type:
-                return self._cells_from_row(child)
+                return self._cells_from_row(child, ctx)
         return []
 
-    def _cells_from_row(self, row_node) -> list[str]:
-        """Extract text from pipe_table_cell nodes in a row."""
+    def _cells_from_row(self, row_node, ctx: ParseContext) -> list[str]:
+        """Extract cell text from a row by splitting its source line on pipes.
+
+        Rows containing an escaped ``\\|`` fall back to the parsed
+        pipe_table_cell children so the escape is honoured.
+        """
+        raw = row_node.text.decode("utf-8").strip()
+        if "\\|" not in raw:
+            if raw.startswith("|"):
+                raw = raw[1:]
+            if raw.endswith("|"):
+                raw = raw[:-1]
+            # Strip backticks from inline code
+            return [cell.strip().strip("`") for cell in raw.split("|")]
+
         cells = []
         for child in row_node.children:
             if child.type == "pipe_table_cell":
-                text = child.text.decode("utf-8").strip()
+                text = ctx.text(child).strip()
                 # Strip backticks from inline code
                 text = text.strip("`")
                 cells.append(text)
@@ -261,30 +432,8 @@ class TableVisitor(NodeVisitor):
 
     def _infer_action_from_section(self, section_title: str) -> str:
         """Infer CREATE/MODIFY/REFERENCE/DELETE from section heading text."""
-        lower = section_title.lower()
-        # Keywords suggesting modification of existing files
-        modify_kw = ("modify", "modif", "existing", "requiring modification", "touchpoint",
-                      "updates", "update", "integration point")
-        # Keywords suggesting new file creation
-        create_kw = ("new", "create", "new file", "requirements")
-        # Keywords suggesting reference-only
-        ref_kw = ("reference", "searched", "cross-reference", "discovered", "discovery")
-        # Keywords suggesting deletion
-        del_kw = ("delete", "removed", "deprecated")
-
-        for kw in del_kw:
-            if kw in lower:
-                return "DELETE"
-        for kw in modify_kw:
-            if kw in lower:
-                return "MODIFY"
-        for kw in create_kw:
-            if kw in lower:
-                return "CREATE"
-        for kw in ref_kw:
-            if kw in lower:
-                return "REFERENCE"
-        return ""
+        match = _ACTION_KEYWORD_RE.match(section_title.lower())
+        return match.lastgroup if match else ""
 
     # Normalize transformation/action values to canonical actions
     _ACTION_MAP = {
@@ -296,7 +445,7 @@ class TableVisitor(NodeVisitor):
         "AUTO-GENERATED": "AUTO-GENERATED",
     }
 
-    def _extract_file_entries(self, table_node, headers, doc, source_lines):
+    def _extract_file_entries(self, table_node, headers, doc, ctx):
         """Extract FileEntry objects from a file table."""
         # Find the file path column (may be "file", "file path", "target file", etc.)
         file_cols = ("file", "file path", "file_path", "target file")
@@ -340,7 +489,7 @@ class TableVisitor(NodeVisitor):
                 break
 
         # Find the section this table belongs to
-        section = self._find_parent_section(table_node, source_lines)
+        section = self._find_parent_section(table_node, ctx)
 
         # Infer action from section heading when no explicit action column
         inferred_action = ""
@@ -350,7 +499,7 @@ class TableVisitor(NodeVisitor):
         for child in table_node.children:
             if child.type != "pipe_table_row":
                 continue
-            cells = self._cells_from_row(child)
+            cells = self._cells_from_row(child, ctx)
             if len(cells) <= file_idx:
                 continue
 
@@ -367,7 +516,7 @@ class TableVisitor(NodeVisitor):
             src_lines = self._extract_line_count(cells, file_idx, source_file_idx, key_changes_idx)
 
             if path and action in ("CREATE", "MODIFY", "AUTO-GENERATED", "REFERENCE", "DELETE"):
-                doc.files.append(FileEntry(
+                doc.add_file(FileEntry(
                     path=path,
                     action=action,
                     purpose=purpose,
@@ -416,7 +565,7 @@ class TableVisitor(NodeVisitor):
                         return val
         return 0
 
-    def _extract_dep_entries(self, table_node, headers, doc):
+    def _extract_dep_entries(self, table_node, headers, doc, ctx):
         """Extract DependencyEntry objects from a dependency table."""
         reg_idx = headers.index("registry")
         pkg_idx = headers.index("package")
@@ -426,7 +575,7 @@ class TableVisitor(NodeVisitor):
         for child in table_node.children:
             if child.type != "pipe_table_row":
                 continue
-            cells = self._cells_from_row(child)
+            cells = self._cells_from_row(child, ctx)
             if len(cells) <= max(reg_idx, pkg_idx):
                 continue
 
@@ -437,30 +586,24 @@ class TableVisitor(NodeVisitor):
                 purpose=cells[pur_idx].strip() if pur_idx >= 0 and len(cells) > pur_idx else "",
             ))
 
-    def _find_parent_section(self, node, source_lines: list[str]) -> str:
-        """Walk backwards from node's line to find the nearest heading."""
-        line = node.start_point[0]
-        for i in range(line, -1, -1):
-            if i < len(source_lines):
-                stripped = source_lines[i].strip()
-                if stripped.startswith("#"):
-                    return stripped.lstrip("#").strip()
-        return ""
+    def _find_parent_section(self, node, ctx: ParseContext) -> str:
+        """Look up the nearest heading at or above the node's line."""
+        i = bisect.bisect_right(ctx.section_rows, node.start_point[0])
+        return ctx.section_titles[i - 1] if i else ""
 
 
 class CodeBlockVisitor(NodeVisitor):
     """Detects mermaid diagrams and code blocks from fenced_code_block nodes."""
 
-    def visit(self, node, doc: AAPDocument, source_lines: list[str]) -> None:
-        if node.type != "fenced_code_block":
-            return
+    node_types = ("fenced_code_block",)
 
+    def visit(self, node, doc: AAPDocument, ctx: ParseContext) -> None:
         doc.code_blocks += 1
 
         # Check for mermaid info string
         for child in node.children:
             if child.type == "info_string":
-                lang_text = child.text.decode("utf-8").strip().lower()
+                lang_text = ctx.text(child).strip().lower()
                 if lang_text == "mermaid":
                     doc.mermaid_diagrams += 1
                     break
@@ -471,46 +614,25 @@ class RuleVisitor(NodeVisitor):
 
     _MUST_RE = re.compile(r"\b(MUST(?:\s+NOT)?|MUST NEVER|NEVER)\b")
 
-    def visit(self, node, doc: AAPDocument, source_lines: list[str]) -> None:
-        if node.type != "section":
-            return
+    node_types = ("section",)
 
-        # Check if this section has a heading starting with 0.7
-        heading = self._get_section_heading(node)
-        if not heading or not heading.startswith("0.7"):
-            return
-
-        # Extract the heading info
-        heading_node = None
-        for child in node.children:
-            if child.type == "atx_heading":
-                heading_node = child
-                break
-
-        if not heading_node:
-            return
-
-        title = ""
-        number = ""
-        for child in heading_node.children:
-            if child.type == "inline":
-                text = child.text.decode("utf-8").strip()
-                match = re.match(r"^(\d+(?:\.\d+)*\.?)\s+(.+)$", text)
-                if match:
-                    number = match.group(1).rstrip(".")
-                    title = match.group(2).strip()
-
-        if not number.startswith("0.7"):
+    def visit(self, node, doc: AAPDocument, ctx: ParseContext) -> None:
+        # Only process subsections (0.7.X), not the parent 0.7
+        heading_node, number, text = _section_heading(node, ctx)
+        if number[:3] != "0.7" or number == "0.7":
             return
 
-        # Only process subsections (0.7.X), not the parent 0.7
-        if number == "0.7":
+        match = _NUM_TITLE_RE.match(text)
+        if not match:
             return
+        number = match.group(1).rstrip(".")
+        title = match.group(2).strip()
 
         # Extract MUST/MUST NOT constraints from the section content
         constraints = []
         start_line = heading_node.start_point[0]
         end_line = node.end_point[0]
+        source_lines = ctx.source_lines
         for i in range(start_line, min(end_line + 1, len(source_lines))):
             line = source_lines[i]
             if self._MUST_RE.search(line):
@@ -525,18 +647,6 @@ class RuleVisitor(NodeVisitor):
                 constraints=constraints,
             ))
 
-    def _get_section_heading(self, section_node) -> str:
-        """Get the heading number from a section node."""
-        for child in section_node.children:
-            if child.type == "atx_heading":
-                for sub in child.children:
-                    if sub.type == "inline":
-                        text = sub.text.decode("utf-8").strip()
-                        match = re.match(r"^(\d+(?:\.\d+)*)", text)
-                        if match:
-                            return match.group(1)
-        return ""
-
 
 class SourceLineMapVisitor(NodeVisitor):
     """Builds a source file → line count map from tables and code blocks.
@@ -556,22 +666,24 @@ class SourceLineMapVisitor(NodeVisitor):
     # Table with source file and bare number lines column
     _BARE_NUM_RE = re.compile(r"^[\d,]+$")
 
-    def visit(self, node, doc: AAPDocument, source_lines: list[str]) -> None:
+    node_types = ("fenced_code_block", "pipe_table")
+
+    def visit(self, node, doc: AAPDocument, ctx: ParseContext) -> None:
         if node.type == "fenced_code_block":
-            self._extract_from_code_block(node, doc)
-        elif node.type == "pipe_table":
-            self._extract_from_table(node, doc)
+            self._extract_from_code_block(node, doc, ctx)
+        else:
+            self._extract_from_table(node, doc, ctx)
 
-    def _extract_from_code_block(self, node, doc: AAPDocument) -> None:
+    def _extract_from_code_block(self, node, doc: AAPDocument, ctx: ParseContext) -> None:
         """Extract line counts from tree-style code blocks."""
-        text = node.text.decode("utf-8")
+        text = ctx.text(node)
         for match in self._TREE_LINE_RE.finditer(text):
             filename = match.group(1)
             count = int(match.group(2).replace(",", ""))
             if count > 50:  # filter noise
                 doc.source_line_map[filename] = max(doc.source_line_map.get(filename, 0), count)
 
-    def _extract_from_table(self, node, doc: AAPDocument) -> None:
+    def _extract_from_table(self, node, doc: AAPDocument, ctx: ParseContext) -> None:
         """Extract line counts from tables with a 'Lines' column."""
         # Get header cells
         header_cells = []
@@ -579,7 +691,7 @@ class SourceLineMapVisitor(NodeVisitor):
             if child.type == "pipe_table_header":
                 for cell in child.children:
                     if cell.type == "pipe_table_cell":
-                        header_cells.append(cell.text.decode("utf-8").strip().lower())
+                        header_cells.append(ctx.text(cell).strip().lower())
                 break
 
         if not header_cells:
@@ -603,7 +715,7 @@ class SourceLineMapVisitor(NodeVisitor):
             cells = []
             for cell in child.children:
                 if cell.type == "pipe_table_cell":
-                    cells.append(cell.text.decode("utf-8").strip().strip("`"))
+                    cells.append(ctx.text(cell).strip().strip("`"))
             if len(cells) <= max(file_idx, lines_idx):
                 continue
 
@@ -632,41 +744,22 @@ class SourceLineMapVisitor(NodeVisitor):
 class ScopeVisitor(NodeVisitor):
     """Extracts in-scope/out-of-scope items from 0.6-numbered sections."""
 
-    def visit(self, node, doc: AAPDocument, source_lines: list[str]) -> None:
-        if node.type != "section":
-            return
-
-        heading = self._get_section_heading(node)
-        if not heading or not heading.startswith("0.6"):
-            return
-
-        heading_node = None
-        for child in node.children:
-            if child.type == "atx_heading":
-                heading_node = child
-                break
+    node_types = ("section",)
 
-        if not heading_node:
+    def visit(self, node, doc: AAPDocument, ctx: ParseContext) -> None:
+        heading_node, number, text = _section_heading(node, ctx)
+        if number[:3] != "0.6":
             return
 
-        title_text = ""
-        for child in heading_node.children:
-            if child.type == "inline":
-                title_text = child.text.decode("utf-8").strip().lower()
-
+        title_text = text.lower()
         is_in_scope = "in scope" in title_text or "in-scope" in title_text or title_text.endswith("in scope")
         is_out_scope = "out of scope" in title_text or "out-of-scope" in title_text
 
         if not is_in_scope and not is_out_scope:
             # Check subsection number to guess: 0.6.1 = in scope, 0.6.2 = out of scope
-            match = re.match(r"^(\d+(?:\.\d+)*)", title_text)
-            if not match:
-                return
-            # Fall through to extract items generically
-            heading_num = self._get_section_heading(node)
-            if heading_num == "0.6.1":
+            if number == "0.6.1":
                 is_in_scope = True
-            elif heading_num == "0.6.2":
+            elif number == "0.6.2":
                 is_out_scope = True
             else:
                 return
@@ -674,6 +767,7 @@ class ScopeVisitor(NodeVisitor):
         start_line = heading_node.end_point[0] + 1
         end_line = node.end_point[0]
 
+        source_lines = ctx.source_lines
         for i in range(start_line, min(end_line + 1, len(source_lines))):
             line = source_lines[i].strip()
             if line.startswith("- **") or line.startswith("- "):
@@ -684,25 +778,95 @@ class ScopeVisitor(NodeVisitor):
                         in_scope=is_in_scope,
                     ))
 
-    def _get_section_heading(self, section_node) -> str:
-        for child in section_node.children:
-            if child.type == "atx_heading":
-                for sub in child.children:
-                    if sub.type == "inline":
-                        text = sub.text.decode("utf-8").strip()
-                        match = re.match(r"^(\d+(?:\.\d+)*)", text)
-                        if match:
-                            return match.group(1)
-        return ""
-
 
 # ---------------------------------------------------------------------------
 # Parser
 # ---------------------------------------------------------------------------
 
+# Architectural layers for the LoC breakdown, as (layer, path substrings).
+# Ordered rules — first match wins. Supports multiple project layouts:
+# - Rust: src/, tests/
+# - Python: python/, lib/, include/, test/
+# - C++/MLIR: lib/, include/, bin/, third_party/
+# - Generic: docs/, .github/, etc.
+_LAYER_RULES: list[tuple[str, list[str]]] = [
+    # Tests (check before source so test/ under python/ matches here)
+    ("Tests", [
+        "python/test/", "test/", "tests/", "spec/",
+    ]),
+    # C++ MLIR dialect IR (TableGen defs + implementations)
+    ("C++ Dialect IR", [
+        "include/triton/Dialect/", "lib/Dialect/",
+    ]),
+    # C++ conversion passes
+    ("C++ Conversion", [
+        "include/triton/Conversion/", "lib/Conversion/",
+    ]),
+    # C++ analysis / target / tools
+    ("C++ Infrastructure", [
+        "lib/Analysis/", "lib/Target/", "lib/Tools/",
+        "include/triton/Analysis/", "include/triton/Target/",
+    ]),
+    # PyBind11 bridge
+    ("Python Bindings (pybind11)", [
+        "python/src/",
+    ]),
+    # Python package source
+    ("Python Source", [
+        "python/triton/", "python/",
+    ]),
+    # Backend / third-party
+    ("Backends", [
+        "third_party/",
+    ]),
+    # CLI / binary tools
+    ("CLI / Tools", [
+        "bin/",
+    ]),
+    # Rust layout (crate directories and src/)
+    ("Rust Source", [
+        "exim-", "openssl-", "src/main.rs", "src/lib.rs", "src/",
+    ]),
+    # Build system
+    ("Build System", [
+        "CMakeLists.txt", "setup.py", "pyproject.toml",
+        "Cargo.toml", "Makefile", ".cmake",
+    ]),
+    # CI/CD
+    ("CI/CD", [
+        ".github/", ".gitlab-ci", "Jenkinsfile",
+    ]),
+    # Benchmarking
+    ("Benchmarking", [
+        "bench/",
+    ]),
+    # Documentation
+    ("Documentation", [
+        "docs/", "doc/", "README", "CHANGELOG",
+    ]),
+]
+
+# All layer rules in one regex. Each rule is an anchored lookahead for any of
+# its substrings followed by an empty named group, so match() scans the path
+# in C and lastgroup names the first rule (in list order) that matches.
+_LAYER_RE = re.compile(
+    "|".join(
+        f"(?=.*?(?:{'|'.join(re.escape(p) for p in prefixes)}))(?P<L{i}>)"
+        for i, (_, prefixes) in enumerate(_LAYER_RULES)
+    ),
+    re.DOTALL,
+)
+_LAYER_NAMES = [name for name, _ in _LAYER_RULES]
+
+
 class AAPParser:
     """Parses an AAP document using tree-sitter-markdown."""
 
+    # Section numbers whose subtrees the section visitors (rules, scope) read
+    _SECTION_PREFIXES = ("0.6", "0.7")
+    # Block nodes that can contain nested sections
+    _SECTION_CONTAINERS = frozenset({"document", "section", "list", "list_item", "block_quote"})
+
     def __init__(self, config: AAPConfig | None = None):
         self.config = config or AAPConfig()
         self._visitors = [
@@ -713,35 +877,109 @@ class AAPParser:
             RuleVisitor(self.config),
             ScopeVisitor(self.config),
         ]
-
-    def parse(self, source: str) -> AAPDocument:
-        """Parse an AAP document and return extracted data."""
+        # node type -> visitors interested in it, in registration order.
+        # Section visitors run in a separate, pruned pass (see _walk_sections).
+        self._dispatch: dict[str, list[NodeVisitor]] = {}
+        for visitor in self._visitors:
+            for node_type in visitor.node_types:
+                self._dispatch.setdefault(node_type, []).append(visitor)
+        self._section_visitors = self._dispatch.pop("section", [])
+        # Parser instances are not thread-safe; each AAPParser owns one.
+        # Grammars load on first use, so importing this module stays cheap.
+        _load_languages()
+        markdown = _LANGUAGES.get("markdown")
+        self._parser = Parser(markdown) if markdown is not None else None
+
+    def parse(self, source: str, data: bytes | None = None) -> AAPDocument:
+        """Parse an AAP document and return extracted data.
+
+        ``data`` may carry the UTF-8 encoding of ``source`` when the caller
+        already has it (e.g. the file's raw bytes), saving a re-encode.
+        """
         doc = AAPDocument()
-        source_lines = source.splitlines()
-        doc.total_lines = len(source_lines)
 
-        parser = get_parser("markdown")
+        parser = self._parser
         if parser is None:
             # Fall back to regex-based extraction
-            return self._fallback_parse(source, source_lines)
-
-        tree = parser.parse(source.encode("utf-8"))
-        self._walk_tree(tree.root_node, doc, source_lines)
+            return self._fallback_parse(source, source.splitlines())
+
+        # The encoded bytes are the only copy of the text kept alongside the
+        # tree; visitors decode individual lines on demand.
+        if data is None:
+            data = source.encode("utf-8")
+        if _OTHER_LINE_BREAK_RE.search(source):
+            # Uncommon line breaks: keep str.splitlines() semantics
+            source_lines = source.splitlines()
+        else:
+            source_lines = LineBuffer(data)
+        doc.total_lines = len(source_lines)
+        tree = parser.parse(data)
+        section_rows, section_titles = _index_sections(source)
+        ctx = ParseContext(
+            source_lines=source_lines,
+            section_rows=section_rows,
+            section_titles=section_titles,
+        )
+        self._walk_tree(tree.root_node, doc, ctx)
+        self._walk_sections(tree.root_node, doc, ctx)
 
         # Enrich file entries with source line counts from the map
         self._enrich_file_source_lines(doc)
 
-        # Build heading hierarchy
-        self._build_hierarchy(doc)
-
         return doc
 
-    def _walk_tree(self, node, doc: AAPDocument, source_lines: list[str]) -> None:
-        """Recursive dispatch to visitors."""
-        for visitor in self._visitors:
-            visitor.visit(node, doc, source_lines)
-        for child in node.children:
-            self._walk_tree(child, doc, source_lines)
+    def _walk_tree(self, node, doc: AAPDocument, ctx: ParseContext) -> None:
+        """Pre-order walk of the AST with a TreeCursor, dispatching each node by type.
+
+        The cursor moves through the tree in C without materializing a
+        ``children`` list per node.
+        """
+        dispatch = self._dispatch
+        cursor = node.walk()
+        while True:
+            current = cursor.node
+            for visitor in dispatch.get(current.type, ()):
+                visitor.visit(current, doc, ctx)
+            if cursor.goto_first_child():
+                continue
+            while not cursor.goto_next_sibling():
+                if not cursor.goto_parent():
+                    return
+
+    def _walk_sections(self, node, doc: AAPDocument, ctx: ParseContext) -> None:
+        """Walk only the section tree, dispatching section nodes to section visitors.
+
+        Leaf blocks (tables, paragraphs, code) are never entered, and a numbered
+        section is only descended into when it can contain a 0.6 / 0.7
+        subsection, so most of a large AAP is skipped.
+        """
+        visitors = self._section_visitors
+        if not visitors:
+            return
+        containers = self._SECTION_CONTAINERS
+        cursor = node.walk()
+        while True:
+            current = cursor.node
+            descend = current.type in containers
+            if current.type == "section":
+                for visitor in visitors:
+                    visitor.visit(current, doc, ctx)
+                _, number, _ = _section_heading(current, ctx)
+                descend = self._may_contain_section_data(number)
+            if descend and cursor.goto_first_child():
+                continue
+            while not cursor.goto_next_sibling():
+                if not cursor.goto_parent():
+                    return
+
+    def _may_contain_section_data(self, number: str) -> bool:
+        """Whether a section with this number can hold 0.6 / 0.7 content."""
+        if not number:
+            return True
+        return any(
+            number.startswith(prefix) or prefix.startswith(number + ".")
+            for prefix in self._SECTION_PREFIXES
+        )
 
     def _enrich_file_source_lines(self, doc: AAPDocument) -> None:
         """Cross-reference file entries with the source line count map.
@@ -754,8 +992,6 @@ class AAPParser:
         if not doc.source_line_map:
             return
 
-        _file_re = re.compile(r"([a-zA-Z_][\w.-]*\.[ch])")
-        _dir_re = re.compile(r"([a-zA-Z_][\w.-]*/)")
         _source_exts = (".rs", ".c", ".cpp", ".cc", ".h", ".py", ".go", ".java", ".ts", ".js")
 
         # Pass 1: Map each eligible file to its referenced source entries (files or dirs)
@@ -779,10 +1015,10 @@ class AAPParser:
                 if not text:
                     continue
                 # Check for file matches first
-                matches = _file_re.findall(text)
+                matches = _SOURCE_FILE_REF_RE.findall(text)
                 found = {m for m in matches if m in doc.source_line_map}
                 # Also check for directory matches
-                dir_matches = _dir_re.findall(text)
+                dir_matches = _SOURCE_DIR_REF_RE.findall(text)
                 dir_found = {m for m in dir_matches if m in doc.source_line_map}
                 found.update(dir_found)
 
@@ -811,7 +1047,7 @@ class AAPParser:
                 doc.files[i].source_lines = total
 
     def _build_hierarchy(self, doc: AAPDocument) -> None:
-        """Nest headings into parent-child relationships."""
+        """Nest headings into parent-child relationships (fallback parse only)."""
         if not doc.headings:
             return
 
@@ -828,31 +1064,34 @@ class AAPParser:
         doc = AAPDocument()
         doc.total_lines = len(source_lines)
 
-        heading_re = re.compile(r"^(#{1,6})\s+(.+)$")
-        number_re = re.compile(r"^(\d+(?:\.\d+)*\.?)\s+(.+)$")
-
-        for i, line in enumerate(source_lines):
-            m = heading_re.match(line)
-            if m:
-                level = len(m.group(1))
-                text = m.group(2).strip()
-                nm = number_re.match(text)
-                number = nm.group(1).rstrip(".") if nm else ""
-                title = nm.group(2).strip() if nm else text
-                doc.headings.append(HeadingNode(level=level, number=number, title=title, line=i + 1))
-
-            if line.strip().startswith("```mermaid"):
+        # Rejoin on "\n" so multiline scans see exactly the lines splitlines() produced
+        text = "\n".join(source_lines)
+        number_match = _NUM_TITLE_RE.match
+
+        row = 0
+        pos = 0
+        for m in _HEADING_LINE_RE.finditer(text):
+            row += text.count("\n", pos, m.start())
+            pos = m.start()
+            level = len(m.group(1))
+            heading_text = m.group(2).strip()
+            nm = number_match(heading_text)
+            number = nm.group(1).rstrip(".") if nm else ""
+            title = nm.group(2).strip() if nm else heading_text
+            doc.headings.append(HeadingNode(level=level, number=number, title=title, line=row + 1))
+
+        # Fence lines with an info string ("```mermaid", "```python", ...)
+        for m in _FENCE_LINE_RE.finditer(source):
+            info = m.group(1)
+            if info.startswith("mermaid"):
                 doc.mermaid_diagrams += 1
-            if line.strip().startswith("```") and not line.strip() == "```":
+            if info.strip():
                 doc.code_blocks += 1
 
         # Simple table extraction for file tables (with explicit action/transformation column)
-        table_re = re.compile(r"^\|\s*`?([^|`]+?)`?\s*\|\s*(CREATE|MODIFY|UPDATE|REFERENCE|DELETE)\s*\|\s*(.+?)\s*\|")
-        for line in source_lines:
-            m = table_re.match(line)
-            if m:
-                action = {"UPDATE": "MODIFY"}.get(m.group(2), m.group(2))
-                doc.files.append(FileEntry(path=m.group(1).strip(), action=action, purpose=m.group(3).strip()))
+        for m in _FALLBACK_TABLE_RE.finditer(text):
+            action = {"UPDATE": "MODIFY"}.get(m.group(2), m.group(2))
+            doc.add_file(FileEntry(path=m.group(1).strip(), action=action, purpose=m.group(3).strip()))
 
         self._build_hierarchy(doc)
         return doc
@@ -860,12 +1099,18 @@ class AAPParser:
     def format_output(self, doc: AAPDocument) -> str:
         """Format extracted data as structured markdown output."""
         lines = []
+        # Partitions used by both the summary and the detail sections
+        top_level = [h for h in doc.headings if h.level == 1]
+        in_scope: list[ScopeItem] = []
+        out_scope: list[ScopeItem] = []
+        for s in doc.scope_items:
+            (in_scope if s.in_scope else out_scope).append(s)
 
         # --- Summary ---
         lines.append(f"# AAP Analysis Summary")
         lines.append("")
         lines.append(f"- **Total lines**: {doc.total_lines:,}")
-        lines.append(f"- **Major sections**: {doc.major_sections}")
+        lines.append(f"- **Major sections**: {len(top_level)}")
         lines.append(f"- **Total headings**: {len(doc.headings)}")
         file_parts = [f"{doc.create_count} CREATE", f"{doc.modify_count} MODIFY"]
         if doc.reference_count:
@@ -875,7 +1120,7 @@ class AAPParser:
         lines.append(f"- **Files referenced**: {len(doc.files)} ({', '.join(file_parts)})")
         lines.append(f"- **Dependencies**: {len(doc.dependencies)}")
         lines.append(f"- **Rules**: {len(doc.rules)}")
-        lines.append(f"- **Scope items**: {len(doc.scope_items)} ({sum(1 for s in doc.scope_items if s.in_scope)} in-scope, {sum(1 for s in doc.scope_items if not s.in_scope)} out-of-scope)")
+        lines.append(f"- **Scope items**: {len(doc.scope_items)} ({len(in_scope)} in-scope, {len(out_scope)} out-of-scope)")
         lines.append(f"- **Mermaid diagrams**: {doc.mermaid_diagrams}")
         lines.append(f"- **Code blocks**: {doc.code_blocks}")
         lines.append("")
@@ -883,7 +1128,6 @@ class AAPParser:
         # --- Section Hierarchy ---
         lines.append("## Section Hierarchy")
         lines.append("")
-        top_level = [h for h in doc.headings if h.level == 1]
         for h in top_level:
             self._format_heading_tree(h, lines, indent=0)
         lines.append("")
@@ -894,8 +1138,10 @@ class AAPParser:
             lines.append("")
             lines.append("| # | File | Action | Purpose |")
             lines.append("|---|------|--------|---------|")
-            for i, f in enumerate(doc.files, 1):
-                lines.append(f"| {i} | `{f.path}` | {f.action} | {f.purpose} |")
+            lines.extend(
+                f"| {i} | `{f.path}` | {f.action} | {f.purpose} |"
+                for i, f in enumerate(doc.files, 1)
+            )
             lines.append("")
 
         # --- Dependencies ---
@@ -904,8 +1150,10 @@ class AAPParser:
             lines.append("")
             lines.append("| Registry | Package | Version | Purpose |")
             lines.append("|----------|---------|---------|---------|")
-            for d in doc.dependencies:
-                lines.append(f"| {d.registry} | {d.package} | {d.version} | {d.purpose} |")
+            lines.extend(
+                f"| {d.registry} | {d.package} | {d.version} | {d.purpose} |"
+                for d in doc.dependencies
+            )
             lines.append("")
 
         # --- Rules ---
@@ -915,27 +1163,22 @@ class AAPParser:
             for rule in doc.rules:
                 lines.append(f"### {rule.section_number} {rule.title}")
                 if rule.constraints:
-                    for c in rule.constraints:
-                        lines.append(f"- {c}")
+                    lines.extend(f"- {c}" for c in rule.constraints)
                 else:
                     lines.append("- *(no MUST/MUST NOT constraints extracted)*")
                 lines.append("")
 
         # --- Scope ---
-        in_scope = [s for s in doc.scope_items if s.in_scope]
-        out_scope = [s for s in doc.scope_items if not s.in_scope]
         if in_scope or out_scope:
             lines.append("## Scope Boundaries")
             lines.append("")
             if in_scope:
                 lines.append("### In Scope")
-                for s in in_scope:
-                    lines.append(f"- {s.description}")
+                lines.extend(f"- {s.description}" for s in in_scope)
                 lines.append("")
             if out_scope:
                 lines.append("### Out of Scope")
-                for s in out_scope:
-                    lines.append(f"- {s.description}")
+                lines.extend(f"- {s.description}" for s in out_scope)
                 lines.append("")
 
         # --- LoC Estimates ---
@@ -943,16 +1186,17 @@ class AAPParser:
             lines.append("## LoC Estimates")
             lines.append("")
 
-            # Per-file estimates
-            file_locs = [(f, self._estimate_file_loc(f)) for f in doc.files]
-            total_loc = sum(loc for _, loc in file_locs)
-            create_loc = sum(loc for f, loc in file_locs if f.action == "CREATE")
-            modify_loc = sum(loc for f, loc in file_locs if f.action == "MODIFY")
+            # Per-file estimates, totals and layer breakdown
+            summary = self._analyze_files(doc)
+            file_locs = summary.file_locs
+            total_loc = summary.total_loc
+            create_loc = summary.loc_by_action["CREATE"]
+            modify_loc = summary.loc_by_action["MODIFY"]
 
             # Count how many files had source line data vs heuristic
-            source_informed = sum(1 for f in doc.files if f.source_lines > 0 and f.action == "CREATE")
+            source_informed = summary.source_informed
             heuristic_only = doc.create_count - source_informed
-            total_source_lines = sum(f.source_lines for f in doc.files if f.source_lines > 0)
+            total_source_lines = summary.total_source_lines
 
             method_parts = []
             if source_informed:
@@ -975,17 +1219,16 @@ class AAPParser:
             lines.append("")
 
             # Layer breakdown
-            layers = self._group_files_by_layer(doc)
+            layers = summary.layers
             if layers:
                 lines.append("### LoC by Layer")
                 lines.append("")
                 lines.append("| Layer | CREATE | MODIFY | Est. LoC |")
                 lines.append("|-------|--------|--------|----------|")
-                for layer_name, layer_files in sorted(layers.items()):
-                    c = sum(1 for f in layer_files if f.action == "CREATE")
-                    m = sum(1 for f in layer_files if f.action == "MODIFY")
-                    layer_loc = sum(self._estimate_file_loc(f) for f in layer_files)
-                    lines.append(f"| {layer_name} | {c} | {m} | {layer_loc:,} |")
+                lines.extend(
+                    f"| {layer_name} | {c} | {m} | {layer_loc:,} |"
+                    for layer_name, (c, m, layer_loc) in sorted(layers.items())
+                )
                 lines.append("")
 
             # Top files by estimated LoC (verbose only)
@@ -996,16 +1239,19 @@ class AAPParser:
                 lines.append("")
                 lines.append("| # | File | Action | Est. LoC |")
                 lines.append("|---|------|--------|----------|")
-                for i, (f, loc) in enumerate(sorted_files[:top_n], 1):
-                    lines.append(f"| {i} | `{f.path}` | {f.action} | {loc:,} |")
+                lines.extend(
+                    f"| {i} | `{f.path}` | {f.action} | {loc:,} |"
+                    for i, (f, loc) in enumerate(sorted_files[:top_n], 1)
+                )
                 lines.append("")
 
         if self.config.verbose and doc.headings:
             lines.append("## Verbose: All Headings")
             lines.append("")
-            for h in doc.headings:
-                prefix = "  " * (h.level - 1)
-                lines.append(f"{prefix}- [{h.number}] {h.title} (line {h.line})")
+            lines.extend(
+                f"{'  ' * (h.level - 1)}- [{h.number}] {h.title} (line {h.line})"
+                for h in doc.headings
+            )
             lines.append("")
 
         return "\n".join(lines)
@@ -1066,6 +1312,15 @@ class AAPParser:
         ("test/unit/", 1.4),
         ("tests/", 1.3),
     ]
+    # All multiplier patterns in one regex. Each alternative is an anchored
+    # lookahead, so match() reports the first pattern in list order that occurs
+    # anywhere in the path, not the leftmost occurrence.
+    _LOC_PATH_MULT_RE = re.compile(
+        "|".join(f"(?=.*?{re.escape(pattern)})(?P<g{i}>)"
+                 for i, (pattern, _) in enumerate(_LOC_PATH_MULTIPLIERS)),
+        re.DOTALL,
+    )
+    _LOC_PATH_MULT_VALUES = [mult for _, mult in _LOC_PATH_MULTIPLIERS]
 
     # C-to-Rust expansion ratio: Rust rewrites are typically 1.0–1.3x the C source
     # due to explicit error handling, type annotations, and pattern matching
@@ -1086,114 +1341,86 @@ class AAPParser:
         if f.source_lines > 0:
             return max(int(f.source_lines * self._RUST_EXPANSION_RATIO), 10)
 
-        path = f.path
-        basename = path.rsplit("/", 1)[-1] if "/" in path else path
+        return self._estimate_path_loc(f.path, self.config.loc_create)
+
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
+    def _estimate_path_loc(cls, path: str, default_loc: int) -> int:
+        """Estimate LoC from a path's filename, extension, and directory context.
+
+        Pure in its arguments, so results are cached across calls and reports.
+        """
+        basename = path.rpartition("/")[2]
 
         # Match full filename first (e.g., CMakeLists.txt)
-        base_loc = self._LOC_BY_EXT.get(basename, 0)
+        base_loc = cls._LOC_BY_EXT.get(basename, 0)
         if not base_loc:
             # Match by extension
-            ext = ""
-            if "." in basename:
-                ext = "." + basename.rsplit(".", 1)[-1]
-            base_loc = self._LOC_BY_EXT.get(ext, self.config.loc_create)
+            _, dot, tail = basename.rpartition(".")
+            ext = "." + tail if dot else ""
+            base_loc = cls._LOC_BY_EXT.get(ext, default_loc)
 
         # Apply path-based multiplier (first match wins)
-        for pattern, mult in self._LOC_PATH_MULTIPLIERS:
-            if pattern in path:
-                base_loc = int(base_loc * mult)
-                break
+        match = cls._LOC_PATH_MULT_RE.match(path)
+        if match:
+            base_loc = int(base_loc * cls._LOC_PATH_MULT_VALUES[int(match.lastgroup[1:])])
 
         return max(base_loc, 5)  # floor at 5 LoC
 
-    def _group_files_by_layer(self, doc: AAPDocument) -> dict[str, list[FileEntry]]:
-        """Group files by architectural layer based on path patterns.
+    def _analyze_files(self, doc: AAPDocument) -> FileLocSummary:
+        """Estimate every file's LoC and aggregate totals and layers in one pass.
 
-        Supports multiple project layouts:
-        - Rust: src/, tests/
-        - Python: python/, lib/, include/, test/
-        - C++/MLIR: lib/, include/, bin/, third_party/
-        - Generic: docs/, .github/, etc.
+        Files are assigned to architectural layers by path (see _LAYER_RULES);
+        each layer accumulates [CREATE count, MODIFY count, estimated LoC].
         """
-        # Ordered rules — first match wins
-        rules: list[tuple[str, list[str]]] = [
-            # Tests (check before source so test/ under python/ matches here)
-            ("Tests", [
-                "python/test/", "test/", "tests/", "spec/",
-            ]),
-            # C++ MLIR dialect IR (TableGen defs + implementations)
-            ("C++ Dialect IR", [
-                "include/triton/Dialect/", "lib/Dialect/",
-            ]),
-            # C++ conversion passes
-            ("C++ Conversion", [
-                "include/triton/Conversion/", "lib/Conversion/",
-            ]),
-            # C++ analysis / target / tools
-            ("C++ Infrastructure", [
-                "lib/Analysis/", "lib/Target/", "lib/Tools/",
-                "include/triton/Analysis/", "include/triton/Target/",
-            ]),
-            # PyBind11 bridge
-            ("Python Bindings (pybind11)", [
-                "python/src/",
-            ]),
-            # Python package source
-            ("Python Source", [
-                "python/triton/", "python/",
-            ]),
-            # Backend / third-party
-            ("Backends", [
-                "third_party/",
-            ]),
-            # CLI / binary tools
-            ("CLI / Tools", [
-                "bin/",
-            ]),
-            # Rust layout (crate directories and src/)
-            ("Rust Source", [
-                "exim-", "openssl-", "src/main.rs", "src/lib.rs", "src/",
-            ]),
-            # Build system
-            ("Build System", [
-                "CMakeLists.txt", "setup.py", "pyproject.toml",
-                "Cargo.toml", "Makefile", ".cmake",
-            ]),
-            # CI/CD
-            ("CI/CD", [
-                ".github/", ".gitlab-ci", "Jenkinsfile",
-            ]),
-            # Benchmarking
-            ("Benchmarking", [
-                "bench/",
-            ]),
-            # Documentation
-            ("Documentation", [
-                "docs/", "doc/", "README", "CHANGELOG",
-            ]),
-        ]
-
-        layers: dict[str, list[FileEntry]] = {}
+        summary = FileLocSummary()
+        file_locs = summary.file_locs
+        loc_by_action = summary.loc_by_action
+        layer_match = _LAYER_RE.match
+        layers: defaultdict[str, list[int]] = defaultdict(lambda: [0, 0, 0])
         for f in doc.files:
-            path = f.path
-            matched = False
-            for layer_name, prefixes in rules:
-                for prefix in prefixes:
-                    if prefix in path:
-                        layers.setdefault(layer_name, []).append(f)
-                        matched = True
-                        break
-                if matched:
-                    break
-            if not matched:
-                layers.setdefault("Other", []).append(f)
-        return layers
+            loc = self._estimate_file_loc(f)
+            action = f.action
+            file_locs.append((f, loc))
+            loc_by_action[action] += loc
+            if f.source_lines > 0:
+                summary.total_source_lines += f.source_lines
+                if action == "CREATE":
+                    summary.source_informed += 1
+
+            m = layer_match(f.path)
+            agg = layers[_LAYER_NAMES[int(m.lastgroup[1:])] if m else "Other"]
+            if action == "CREATE":
+                agg[0] += 1
+            elif action == "MODIFY":
+                agg[1] += 1
+            agg[2] += loc
+        summary.total_loc = sum(loc_by_action.values())
+        summary.layers = layers
+        return summary
 
 
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
 
+def _read_source(file_path: Path) -> tuple[str, bytes | None]:
+    """Read an AAP file, returning its text and, when reusable, its raw bytes.
+
+    Clean UTF-8 without carriage returns decodes to text whose encoding is
+    the file itself, so the bytes can feed tree-sitter directly. Anything
+    else goes through the lenient text read (universal newlines, invalid
+    bytes replaced) and is re-encoded by the parser.
+    """
+    data = file_path.read_bytes()
+    if b"\r" not in data:
+        try:
+            return data.decode("utf-8"), data
+        except UnicodeDecodeError:
+            pass
+    return file_path.read_text(errors="replace"), None
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Parse and analyze Agent Action Plan (AAP) documents.",
@@ -1234,11 +1461,9 @@ def main():
         focus=args.focus,
     )
 
-    _load_languages()
-
-    source = file_path.read_text(errors="replace")
+    source, data = _read_source(file_path)
     aap_parser = AAPParser(config)
-    doc = aap_parser.parse(source)
+    doc = aap_parser.parse(source, data)
     print(aap_parser.format_output(doc))
 
 
@@ -13,15 +13,27 @@ Requires: pip install tree-sitter tree-sitter-python tree-sitter-javascript
 
 import argparse
 import difflib
+import hashlib
+import io
+import json
 import os
+import re
+import sqlite3
 import subprocess
 import sys
+import threading
+import time
 import warnings
-from collections import defaultdict
-from dataclasses import dataclass, field
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import astuple, dataclass, field
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
+from typing import TextIO
 
-from tree_sitter import Language, Parser
+from tree_sitter import Language, Parser, Query, QueryCursor
 
 # Suppress deprecation warnings from tree-sitter internals
 warnings.filterwarnings("ignore", category=FutureWarning, module="tree_sitter")
@@ -32,10 +44,12 @@ warnings.filterwarnings("ignore", category=FutureWarning, module="tree_sitter")
 
 _LANGUAGES: dict[str, Language] = {}
 _PARSERS: dict[str, Parser] = {}
+_LOCAL = threading.local()  # per-thread parsers for --threads
 
 
+@lru_cache(maxsize=None)
 def _load_languages():
-    """Load all available tree-sitter languages."""
+    """Load all available tree-sitter languages (only the first call does work)."""
     loaders = {
         "python": ("tree_sitter_python", "language"),
         "javascript": ("tree_sitter_javascript", "language"),
@@ -55,6 +69,7 @@ def _load_languages():
             mod = __import__(module_name)
             lang_func = getattr(mod, func_name)
             _LANGUAGES[lang_name] = Language(lang_func())
+            _PARSERS[lang_name] = Parser(_LANGUAGES[lang_name])
         except ImportError:
             pass  # Language not installed, skip
         except (AttributeError, TypeError, RuntimeError) as e:
@@ -65,13 +80,11 @@ def _load_languages():
 
 
 def get_parser(lang: str) -> Parser | None:
-    """Get a parser for the given language."""
-    if lang not in _PARSERS:
-        if lang not in _LANGUAGES:
-            return None
-        p = Parser(_LANGUAGES[lang])
-        _PARSERS[lang] = p
-    return _PARSERS[lang]
+    """Get the parser for the given language (built by _load_languages).
+
+    Parser threads get their own parsers, since a Parser is not thread-safe.
+    """
+    return getattr(_LOCAL, "parsers", _PARSERS).get(lang)
 
 
 # ---------------------------------------------------------------------------
@@ -118,8 +131,12 @@ class MapperConfig:
     deep_nesting_levels: int = 4
     many_params: int = 5
     large_file_lines: int = 500
+    max_file_bytes: int = 1_000_000  # larger files are counted but not parsed
     skip_smells: set[str] = field(default_factory=set)
     extra_ignore_dirs: set[str] = field(default_factory=set)
+    jobs: int = 0  # parser processes; 0 = one per CPU
+    threads: bool = False  # parse in threads instead of processes
+    cache_path: Path | None = None  # SQLite parse cache; None disables it
 
 
 # ---------------------------------------------------------------------------
@@ -196,6 +213,13 @@ LANG_NODE_TYPES = {
     },
 }
 
+# Frozen copies built once at import: category -> node types per language
+_NO_TYPES: frozenset[str] = frozenset()
+_LANG_SETS: dict[str, dict[str, frozenset[str]]] = {
+    lang: {category: frozenset(types) for category, types in categories.items()}
+    for lang, categories in LANG_NODE_TYPES.items()
+}
+
 # ---------------------------------------------------------------------------
 # FileContext dataclass
 # ---------------------------------------------------------------------------
@@ -206,8 +230,7 @@ class FileContext:
     """Per-file mutable state during AST traversal."""
     rel_path: str
     lang: str
-    node_types: dict
-    source_text: str
+    source: bytes
     classes: list[str] = field(default_factory=list)
     functions: list[str] = field(default_factory=list)
     imports: list[str] = field(default_factory=list)
@@ -217,37 +240,62 @@ class FileContext:
     function_bodies: list[tuple] = field(default_factory=list)  # (name, line, source)
 
 
+@dataclass(slots=True)
+class FileInfo:
+    """Structural summary of one source file (a file_data entry)."""
+    lang: str
+    classes: list[str]
+    functions: list[str]
+    imports: list[str]
+    interfaces: list[str]
+    type_aliases: list[str]
+    line_count: int
+    used_words: frozenset[str] = frozenset()  # Python: words outside import lines
+
+
+@dataclass
+class ParsedFile:
+    """Everything extracted from one source file, ready to merge into the mapper."""
+    rel_path: str
+    info: FileInfo
+    smells: list[dict]
+    function_bodies: list[tuple]  # (file, name, line, source)
+
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
 
-def should_ignore(path: Path, ignore_dirs: set[str]) -> bool:
-    """Check if any component of the path matches an ignore pattern."""
-    parts = path.parts
-    for part in parts:
-        if part in ignore_dirs:
-            return True
-        for pattern in ignore_dirs:
-            if "*" in pattern and part.endswith(pattern.replace("*", "")):
-                return True
-    return False
+def split_ignore_patterns(patterns: set[str]) -> tuple[frozenset[str], tuple[str, ...]]:
+    """Split ignore patterns into exact names and the suffixes of "*" globs."""
+    exact = frozenset(p for p in patterns if "*" not in p)
+    suffixes = tuple(p.replace("*", "") for p in patterns if "*" in p)
+    return exact, suffixes
+
+
+def should_ignore(name: str, exact: frozenset[str], suffixes: tuple[str, ...]) -> bool:
+    """Check if a single path component matches an ignore pattern."""
+    return name in exact or name.endswith(suffixes)
+
 
+def node_bytes(node, source: bytes) -> bytes:
+    """Source bytes of a node, sliced directly rather than through node.text."""
+    return source[node.start_byte:node.end_byte]
 
-def get_node_name(node) -> str | None:
+
+def get_node_name(node, source: bytes) -> str | None:
     """Extract the name from a tree-sitter node."""
     for child in node.children:
         if child.type in (
             "identifier", "name", "type_identifier",
-            "property_identifier", "simple_identifier",
+            "property_identifier", "simple_identifier", "dotted_name",
         ):
-            return child.text.decode("utf-8")
-        if child.type == "dotted_name":
-            return child.text.decode("utf-8")
+            return source[child.start_byte:child.end_byte].decode("utf-8")
     return None
 
 
-def get_function_params(node, lang: str) -> list[str]:
+def get_function_params(node, source: bytes) -> list[str]:
     """Extract parameter names from a function node."""
     params = []
     for child in node.children:
@@ -261,32 +309,63 @@ def get_function_params(node, lang: str) -> list[str]:
                     "default_parameter", "required_parameter", "optional_parameter",
                     "formal_parameter", "parameter",
                 ):
-                    name = get_node_name(param)
+                    name = get_node_name(param, source)
                     if name and name not in ("self", "cls"):
                         params.append(name)
-                    elif param.type == "identifier" and param.text:
-                        text = param.text.decode("utf-8")
-                        if text not in ("self", "cls"):
-                            params.append(text)
+                    elif param.type == "identifier":
+                        text = node_bytes(param, source)
+                        if text and text not in (b"self", b"cls"):
+                            params.append(text.decode("utf-8"))
     return params
 
 
-def count_nesting_depth(node, current_depth: int = 0) -> int:
-    """Find the maximum nesting depth of control flow in a node."""
-    nesting_types = {
-        "if_statement", "for_statement", "while_statement", "try_statement",
-        "with_statement", "for_in_statement", "if_expression",
-        "match_statement", "case_clause",
-        "switch_statement", "for_of_statement",
-    }
-    max_depth = current_depth
-    for child in node.children:
-        if child.type in nesting_types:
-            child_depth = count_nesting_depth(child, current_depth + 1)
-            max_depth = max(max_depth, child_depth)
-        else:
-            child_depth = count_nesting_depth(child, current_depth)
-            max_depth = max(max_depth, child_depth)
+# Control-flow node types that add a nesting level
+_NESTING_TYPES = (
+    "if_statement", "for_statement", "while_statement", "try_statement",
+    "with_statement", "for_in_statement", "if_expression",
+    "match_statement", "case_clause",
+    "switch_statement", "for_of_statement",
+)
+_NESTING_QUERIES: dict[str, Query | None] = {}
+
+
+def _nesting_query(lang: str) -> Query | None:
+    """Query capturing every nesting node type the language's grammar defines."""
+    if lang not in _NESTING_QUERIES:
+        query = None
+        language = _LANGUAGES.get(lang)
+        if language is not None:
+            kinds = [k for k in _NESTING_TYPES if language.id_for_node_kind(k, True) is not None]
+            if kinds:
+                query = Query(language, "[" + " ".join(f"({k})" for k in kinds) + "] @n")
+        _NESTING_QUERIES[lang] = query
+    return _NESTING_QUERIES[lang]
+
+
+def count_nesting_depth(node, lang: str) -> int:
+    """Find the maximum nesting depth of control flow in a node.
+
+    The nesting nodes are matched by a tree-sitter query in C; their depth
+    then follows from byte ranges alone, using a stack of enclosing ends.
+    """
+    query = _nesting_query(lang)
+    if query is None:
+        return 0
+    start, end = node.start_byte, node.end_byte
+    # The cursor also yields matches that merely overlap the node, such as
+    # an if statement the function is defined in
+    spans = sorted(
+        (n.start_byte, -n.end_byte)
+        for n in QueryCursor(query).captures(node).get("n", ())
+        if n.start_byte >= start and n.end_byte <= end
+    )
+    max_depth = 0
+    ends: list[int] = []
+    for n_start, neg_end in spans:
+        while ends and ends[-1] <= n_start:
+            ends.pop()
+        ends.append(-neg_end)
+        max_depth = max(max_depth, len(ends))
     return max_depth
 
 
@@ -312,46 +391,169 @@ def has_docstring(node) -> bool:
     return False
 
 
-def is_catchall_except(node) -> bool:
+def is_catchall_except(node, source: bytes) -> bool:
     """Check if an except clause is a bare except or catches Exception."""
-    children_types = [c.type for c in node.children]
-    if "except" in children_types or node.type == "except_clause":
-        has_type = False
-        for child in node.children:
-            if child.type in ("identifier", "as_pattern"):
-                text = child.text.decode("utf-8") if child.text else ""
-                if "Exception" in text:
-                    return True
-                has_type = True
-        # bare except: with no type specified
-        if not has_type and node.child_count <= 3:
-            texts = [c.text.decode("utf-8") for c in node.children if c.text]
-            if "except" in texts and not any(
-                c.type in ("identifier", "as_pattern", "tuple") for c in node.children
-            ):
+    if node.type == "except_clause" and source.startswith(
+        (b"except:", b"except :"), node.start_byte
+    ):
+        return True  # bare except: decided from the clause's bytes alone
+    children = node.children
+    if node.type != "except_clause" and not any(c.type == "except" for c in children):
+        return False
+    has_type = has_tuple = has_except_kw = False
+    for child in children:
+        if child.type in ("identifier", "as_pattern"):
+            if b"Exception" in node_bytes(child, source):
                 return True
-    return False
+            has_type = True
+        elif child.type == "tuple":
+            has_tuple = True
+        elif child.end_byte - child.start_byte == 6 and node_bytes(child, source) == b"except":
+            has_except_kw = True
+    # bare except: with no type specified
+    return not has_type and not has_tuple and has_except_kw and len(children) <= 3
+
+
+# Identifier-like words, for checking whether an imported name is used
+_WORD_RE = re.compile(r"\w+")
 
 
-def get_import_text(node) -> str:
+def non_import_words(source: bytes) -> frozenset[str]:
+    """Words on the lines of a Python file that are not import statements."""
+    lines = source.decode("utf-8", errors="replace").splitlines()
+    return frozenset(_WORD_RE.findall("\n".join(
+        line for line in lines
+        if not line.strip().startswith(("import ", "from "))
+    )))
+
+
+# Any 100 characters fit in 400 UTF-8 bytes, so a longer import is always
+# truncated and only this much of it needs decoding
+_IMPORT_TEXT_BYTES = 400
+
+
+def get_import_text(node, source: bytes) -> str:
     """Get a readable import string from an import node."""
-    text = node.text.decode("utf-8").strip()
+    start, end = node.start_byte, node.end_byte
+    if end - start > _IMPORT_TEXT_BYTES:
+        text = source[start:start + _IMPORT_TEXT_BYTES].decode("utf-8", errors="replace")
+        return text.lstrip()[:77] + "..."
+    text = source[start:end].decode("utf-8", errors="replace").strip()
     if len(text) > 80:
         text = text[:77] + "..."
     return text
 
 
+def node_depth(node) -> int:
+    """Number of ancestors of a node."""
+    depth = 0
+    while (node := node.parent) is not None:
+        depth += 1
+    return depth
+
+
+def preorder(nodes) -> list:
+    """Sort nodes from one tree into pre-order (document order, parents first).
+
+    Nodes sharing a byte range, such as a one-statement block and its
+    statement, can only be ancestor and descendant, so depth orders them.
+    """
+    spans = [(n.start_byte, n.end_byte) for n in nodes]
+    order = sorted(range(len(spans)), key=lambda k: (spans[k][0], -spans[k][1]))
+    ordered = [nodes[k] for k in order]
+    i, count = 0, len(order)
+    while i < count:
+        span = spans[order[i]]
+        j = i + 1
+        while j < count and spans[order[j]] == span:
+            j += 1
+        if j - i > 1:
+            ordered[i:j] = sorted(ordered[i:j], key=node_depth)
+        i = j
+    return ordered
+
+
+def strongly_connected_components(graph: dict[str, list[str]]) -> list[list[str]]:
+    """Tarjan's algorithm with an explicit work stack, so deep graphs cannot overflow."""
+    index: dict[str, int] = {}
+    low: dict[str, int] = {}
+    stack: list[str] = []
+    on_stack: set[str] = set()
+    components = []
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph[root]))]
+        while work:
+            node, edges = work[-1]
+            for succ in edges:
+                if succ not in index:
+                    index[succ] = low[succ] = len(index)
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(graph.get(succ, ()))))
+                    break
+                if succ in on_stack:
+                    low[node] = min(low[node], index[succ])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def shortest_cycle(start: str, members: set[str], graph: dict[str, list[str]]) -> list[str]:
+    """Shortest path from start back to itself within one strongly connected component."""
+    prev: dict[str, str] = {}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        for succ in graph.get(node, ()):
+            if succ == start:
+                path = [node]
+                while path[-1] != start:
+                    path.append(prev[path[-1]])
+                return path[::-1] + [start]
+            if succ in members and succ not in prev:
+                prev[succ] = node
+                queue.append(succ)
+    return [start]
+
+
 # ---------------------------------------------------------------------------
 # Node Visitors
 # ---------------------------------------------------------------------------
 
 
 class NodeVisitor:
-    """Base class for AST node visitors."""
+    """Base class for AST node visitors.
+
+    The mapper dispatches to visit() only the node types node_types()
+    returns for the file's language, so visitors need not re-check them.
+    """
+
+    CATEGORY = ""  # LANG_NODE_TYPES category handled, if any
 
     def __init__(self, config: MapperConfig):
         self.config = config
 
+    def node_types(self, lang: str) -> frozenset[str]:
+        """Node types this visitor acts on in the given language."""
+        return _LANG_SETS.get(lang, {}).get(self.CATEGORY, _NO_TYPES)
+
     def visit(self, node, ctx: FileContext) -> None:
         """Visit a node and optionally extract data or record smells."""
 
@@ -359,10 +561,10 @@ class NodeVisitor:
 class ClassVisitor(NodeVisitor):
     """Extracts class declarations and detects god classes / missing docstrings."""
 
+    CATEGORY = "classes"
+
     def visit(self, node, ctx: FileContext) -> None:
-        if node.type not in ctx.node_types.get("classes", []):
-            return
-        name = get_node_name(node)
+        name = get_node_name(node, ctx.source)
         if not name:
             return
         ctx.classes.append(name)
@@ -402,10 +604,10 @@ class ClassVisitor(NodeVisitor):
 class FunctionVisitor(NodeVisitor):
     """Extracts function declarations and detects long/deep/many-param functions."""
 
+    CATEGORY = "functions"
+
     def visit(self, node, ctx: FileContext) -> None:
-        if node.type not in ctx.node_types.get("functions", []):
-            return
-        name = get_node_name(node)
+        name = get_node_name(node, ctx.source)
         if not name:
             return
         ctx.functions.append(name)
@@ -423,7 +625,7 @@ class FunctionVisitor(NodeVisitor):
             })
 
         # Deep nesting detection
-        depth = count_nesting_depth(node)
+        depth = count_nesting_depth(node, ctx.lang)
         if depth > self.config.deep_nesting_levels:
             ctx.smells.append({
                 "type": "DEEP_NESTING",
@@ -434,7 +636,7 @@ class FunctionVisitor(NodeVisitor):
             })
 
         # Too many parameters
-        params = get_function_params(node, ctx.lang)
+        params = get_function_params(node, ctx.source)
         if len(params) > self.config.many_params:
             ctx.smells.append({
                 "type": "MANY_PARAMS",
@@ -459,17 +661,17 @@ class FunctionVisitor(NodeVisitor):
 
         # Store function body for duplicate detection (min 10 lines)
         if func_lines >= 10:
-            func_source = node.text.decode("utf-8", errors="replace")
+            func_source = node_bytes(node, ctx.source).decode("utf-8", errors="replace")
             ctx.function_bodies.append((name, node.start_point[0] + 1, func_source))
 
 
 class ImportVisitor(NodeVisitor):
     """Extracts import statements."""
 
+    CATEGORY = "imports"
+
     def visit(self, node, ctx: FileContext) -> None:
-        if node.type not in ctx.node_types.get("imports", []):
-            return
-        imp_text = get_import_text(node)
+        imp_text = get_import_text(node, ctx.source)
         if imp_text:
             ctx.imports.append(imp_text)
 
@@ -477,10 +679,10 @@ class ImportVisitor(NodeVisitor):
 class InterfaceVisitor(NodeVisitor):
     """Extracts interface declarations (TS/TSX)."""
 
+    CATEGORY = "interfaces"
+
     def visit(self, node, ctx: FileContext) -> None:
-        if node.type not in ctx.node_types.get("interfaces", []):
-            return
-        name = get_node_name(node)
+        name = get_node_name(node, ctx.source)
         if name:
             ctx.interfaces.append(name)
 
@@ -488,10 +690,10 @@ class InterfaceVisitor(NodeVisitor):
 class TypeAliasVisitor(NodeVisitor):
     """Extracts type alias declarations (TS/TSX)."""
 
+    CATEGORY = "type_aliases"
+
     def visit(self, node, ctx: FileContext) -> None:
-        if node.type not in ctx.node_types.get("type_aliases", []):
-            return
-        name = get_node_name(node)
+        name = get_node_name(node, ctx.source)
         if name:
             ctx.type_aliases.append(name)
 
@@ -499,32 +701,34 @@ class TypeAliasVisitor(NodeVisitor):
 class CatchAllVisitor(NodeVisitor):
     """Detects bare except / catch-all exception handlers (Python)."""
 
+    def node_types(self, lang: str) -> frozenset[str]:
+        return frozenset({"except_clause"}) if lang == "python" else _NO_TYPES
+
     def visit(self, node, ctx: FileContext) -> None:
-        if ctx.lang != "python" or node.type != "except_clause":
-            return
-        if is_catchall_except(node):
+        if is_catchall_except(node, ctx.source):
             ctx.smells.append({
                 "type": "CATCH_ALL_EXCEPTION",
                 "severity": "high",
                 "file": ctx.rel_path,
                 "line": node.start_point[0] + 1,
-                "detail": node.text.decode("utf-8", errors="replace").split("\n")[0].strip(),
+                "detail": node_bytes(node, ctx.source).decode("utf-8", errors="replace").split("\n")[0].strip(),
             })
 
 
 class DeadCodeVisitor(NodeVisitor):
     """Detects unreachable statements after return/raise/break/continue."""
 
-    BLOCK_TYPES = {"block", "statement_block", "compound_statement"}
+    BLOCK_TYPES = frozenset({"block", "statement_block", "compound_statement"})
     TERMINAL_TYPES = {
         "return_statement", "raise_statement", "break_statement",
         "continue_statement", "throw_statement",
     }
     SKIP_TYPES = {"comment", "newline", "NEWLINE", "INDENT", "DEDENT"}
 
+    def node_types(self, lang: str) -> frozenset[str]:
+        return self.BLOCK_TYPES
+
     def visit(self, node, ctx: FileContext) -> None:
-        if node.type not in self.BLOCK_TYPES:
-            return
         children = [c for c in node.children if c.is_named and c.type not in self.SKIP_TYPES]
         found_terminal = False
         terminal_type = ""
@@ -543,21 +747,150 @@ class DeadCodeVisitor(NodeVisitor):
                 terminal_type = child.type
 
 
+# ---------------------------------------------------------------------------
+# Parse cache
+# ---------------------------------------------------------------------------
+
+# Files are hashed, and oversized files line-counted, in chunks of this size
+_READ_CHUNK = 1 << 20
+
+# Bump whenever extraction or smell detection changes what _parse_file returns
+_CACHE_VERSION = 4
+
+
+class ParseCache:
+    """SQLite store of per-file parse results keyed by (path, content hash).
+
+    The key is the content hash salted with the cache version and every
+    threshold that affects per-file smells, so changing either simply
+    misses. A second table remembers each file's (mtime, size) and content
+    hash, letting unchanged files skip the read and hash too. Rows are
+    stored as JSON rather than pickles: the database lives inside the
+    repository being mapped and must not be able to run code when loaded.
+    """
+
+    def __init__(self, path: Path, config: MapperConfig):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "path TEXT PRIMARY KEY, hash BLOB NOT NULL, data TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fileidx ("
+            "path TEXT PRIMARY KEY, mtime INTEGER NOT NULL, size INTEGER NOT NULL, "
+            "hash BLOB NOT NULL)"
+        )
+        self._salt = repr((
+            _CACHE_VERSION,
+            config.long_func_lines,
+            config.god_class_methods,
+            config.deep_nesting_levels,
+            config.many_params,
+            config.large_file_lines,
+            config.max_file_bytes,
+        )).encode()
+        self._pending: list[tuple[str, bytes, str]] = []
+        self._pending_idx: list[tuple[str, int, int, bytes]] = []
+        # Files modified this close to the scan may change again within the
+        # same mtime tick, so their stat is not trusted for the next run
+        self._racy_ns = time.time_ns() - 2_000_000_000
+        self._index = {
+            path: (mtime, size, digest)
+            for path, mtime, size, digest in self._conn.execute("SELECT * FROM fileidx")
+        }
+
+    def digest(self, rel_path: str, fpath: str, st: os.stat_result) -> bytes:
+        """Content hash of a file, read from the index if its stat is unchanged."""
+        entry = self._index.get(rel_path)
+        if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return entry[2]
+        h = hashlib.blake2b(digest_size=16)
+        with open(fpath, "rb") as f:
+            for chunk in iter(lambda: f.read(_READ_CHUNK), b""):
+                h.update(chunk)
+        digest = h.digest()
+        if st.st_mtime_ns < self._racy_ns:
+            self._pending_idx.append((rel_path, st.st_mtime_ns, st.st_size, digest))
+        return digest
+
+    def key(self, digest: bytes) -> bytes:
+        return hashlib.blake2b(self._salt + digest, digest_size=16).digest()
+
+    def get(self, rel_path: str, key: bytes) -> ParsedFile | None:
+        row = self._conn.execute(
+            "SELECT data FROM cache WHERE path=? AND hash=?", (rel_path, key),
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            info, smells, bodies = json.loads(row[0])
+        except ValueError:
+            return None
+        info = FileInfo(*info)
+        info.used_words = frozenset(info.used_words)
+        return ParsedFile(
+            rel_path=rel_path,
+            info=info,
+            smells=smells,
+            function_bodies=[tuple(b) for b in bodies],
+        )
+
+    def put(self, parsed: ParsedFile, key: bytes) -> None:
+        """Queue a result; all queued rows are written in one transaction on close()."""
+        data = json.dumps(
+            [astuple(parsed.info), parsed.smells, parsed.function_bodies],
+            default=sorted,  # used_words
+        )
+        self._pending.append((parsed.rel_path, key, data))
+
+    def close(self) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (path, hash, data) VALUES (?, ?, ?)",
+                self._pending,
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO fileidx (path, mtime, size, hash) VALUES (?, ?, ?, ?)",
+                self._pending_idx,
+            )
+        self._conn.close()
+        self._pending = []
+        self._pending_idx = []
+
+
 # ---------------------------------------------------------------------------
 # Main mapper
 # ---------------------------------------------------------------------------
 
+# First two whitespace-separated tokens of an import statement, matched
+# without splitting the whole (possibly long) import text
+_IMPORT_HEAD_RE = re.compile(r"\s*(\S+)\s+(\S+)")
+# Leading keywords after which the second token names the module
+_IMPORT_KEYWORDS = frozenset({"import", "from", "#include"})
+
 
 class CodebaseMapper:
     def __init__(self, root: Path, config: MapperConfig | None = None):
         self.root = root
         self.config = config or MapperConfig()
         self.files_parsed = 0
-        self.file_data: dict[str, dict] = {}  # rel_path -> parsed info
+        self.file_data: dict[str, FileInfo] = {}  # rel_path -> parsed info
+        # Summary totals, kept up to date as files are merged
+        self.total_lines = 0
+        self.total_classes = 0
+        self.total_functions = 0
+        self.lang_counts: Counter[str] = Counter()
         self.smells: list[dict] = []
         self.import_graph: dict[str, set[str]] = defaultdict(set)  # module -> imports
-        self._ignore_dirs = DEFAULT_IGNORE_DIRS | self.config.extra_ignore_dirs
+        self._ignore_exact, self._ignore_suffixes = split_ignore_patterns(
+            DEFAULT_IGNORE_DIRS | self.config.extra_ignore_dirs
+        )
         self._function_bodies: list[tuple] = []  # (file, name, line, source)
+        self._file_blocks: dict[str, str] = {}  # rel_path -> rendered map entry
+        self._lang_breakdown: str | None = None  # rendered summary line, if current
 
         # Initialize visitors
         self._visitors = [
@@ -569,81 +902,244 @@ class CodebaseMapper:
             CatchAllVisitor(self.config),
             DeadCodeVisitor(self.config),
         ]
+        # Per language, node type -> the visit methods acting on it, in
+        # visitor order, so the walk makes one dict lookup per node
+        self._dispatch: dict[str, dict[str, tuple]] = {}
+        for lang in _LANG_SETS:
+            table: dict[str, list] = defaultdict(list)
+            for visitor in self._visitors:
+                for node_type in visitor.node_types(lang):
+                    table[node_type].append(visitor.visit)
+            self._dispatch[lang] = {t: tuple(handlers) for t, handlers in table.items()}
+        self._queries: dict[str, Query | None] = {}
 
     def scan(self):
-        """Walk the codebase and parse all recognized source files."""
-        for dirpath, dirnames, filenames in os.walk(self.root):
-            rel_dir = Path(dirpath).relative_to(self.root)
-            if should_ignore(rel_dir, self._ignore_dirs):
-                dirnames.clear()
+        """Walk the codebase and parse all recognized source files.
+
+        Unchanged files are served from the parse cache when one is
+        configured. The rest are parsed in a process pool when there are
+        enough of them to pay for worker start-up; results are merged in walk
+        order either way, so the report does not depend on the cache or on
+        the number of workers.
+        """
+        entries = self._collect_files()
+        jobs = [(entry.path, rel_path, lang) for entry, rel_path, lang in entries]
+        results: list[ParsedFile | None] = [None] * len(jobs)
+        pending = list(range(len(jobs)))
+        keys: dict[int, bytes] = {}
+
+        cache = self._open_cache()
+        if cache is not None:
+            pending = []
+            for i, (entry, rel_path, _) in enumerate(entries):
+                try:
+                    digest = cache.digest(rel_path, entry.path, entry.stat())
+                except OSError:
+                    continue  # _parse_file would skip it too
+                keys[i] = key = cache.key(digest)
+                hit = cache.get(rel_path, key)
+                if hit is None:
+                    pending.append(i)
+                else:
+                    results[i] = hit
+
+        parsed_files = self._parse_jobs([jobs[i] for i in pending])
+        for i, parsed in zip(pending, parsed_files):
+            results[i] = parsed
+            if cache is not None and parsed is not None:
+                cache.put(parsed, keys[i])
+
+        if cache is not None:
+            try:
+                cache.close()
+            except sqlite3.Error:
+                pass  # A failed cache write only costs the next run time
+
+        for parsed in results:
+            if parsed is not None:
+                self._add_parsed(parsed)
+
+    def _open_cache(self) -> ParseCache | None:
+        """Open the configured parse cache, or None if disabled or unusable."""
+        if self.config.cache_path is None:
+            return None
+        try:
+            return ParseCache(self.config.cache_path, self.config)
+        except (OSError, sqlite3.Error):
+            return None
+
+    def _parse_jobs(self, jobs: list[tuple[str, str, str]]) -> list[ParsedFile | None]:
+        """Parse (path, relative path, language) jobs, returning results in job order."""
+        if self.config.threads:
+            workers = self.config.jobs or min(32, (os.cpu_count() or 1) * 4)
+            if workers > 1 and len(jobs) >= _PARALLEL_MIN_FILES:
+                # tree-sitter releases the GIL while parsing, so threads overlap
+                # reads and parses without pickling results across processes
+                with ThreadPoolExecutor(
+                    max_workers=workers, initializer=_init_parse_thread
+                ) as ex:
+                    return list(ex.map(lambda job: self._parse_file(*job), jobs))
+            return [self._parse_file(*job) for job in jobs]
+
+        workers = self.config.jobs or os.cpu_count() or 1
+        if workers > 1 and len(jobs) >= _PARALLEL_MIN_FILES:
+            try:
+                with ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_init_parse_worker,
+                    initargs=(self.root, self.config),
+                ) as ex:
+                    return list(ex.map(_parse_file_worker, jobs, chunksize=32))
+            except (OSError, BrokenProcessPool):
+                pass  # No usable process pool here; parse serially
+
+        return [self._parse_file(fpath, rel_path, lang) for fpath, rel_path, lang in jobs]
+
+    def _collect_files(self) -> list[tuple[os.DirEntry, str, str]]:
+        """Walk the codebase and return (entry, relative path, language) per source file.
+
+        Visits directories in the same order as a top-down os.walk, but keeps
+        the DirEntry objects so the parse cache can reuse their stat results.
+        """
+        exact, suffixes = self._ignore_exact, self._ignore_suffixes
+        # Plain string slicing is much cheaper than Path arithmetic per file
+        root_str = str(self.root)
+        root_len = len(os.path.join(root_str, ""))
+        files = []
+        stack = [root_str]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    dir_entries = list(it)
+            except OSError:
                 continue
-            # Prune ignored dirs from traversal
-            dirnames[:] = [
-                d for d in dirnames
-                if not should_ignore(rel_dir / d, self._ignore_dirs)
-            ]
-            for fname in sorted(filenames):
-                fpath = Path(dirpath) / fname
-                ext = fpath.suffix
-                if ext not in EXT_TO_LANG:
+            subdirs = []
+            found = []
+            for entry in dir_entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    # Prune ignored dirs; parents were already checked, so
+                    # only the name is tested. Symlinked dirs are not followed.
+                    if not should_ignore(entry.name, exact, suffixes) and not entry.is_symlink():
+                        subdirs.append(entry.path)
                     continue
-                lang = EXT_TO_LANG[ext]
-                rel_path = str(fpath.relative_to(self.root))
-                self._parse_file(fpath, rel_path, lang)
+                lang = EXT_TO_LANG.get(os.path.splitext(entry.name)[1])
+                if lang is not None:
+                    found.append((entry.name, entry, lang))
+            found.sort(key=lambda f: f[0])
+            files.extend((entry, entry.path[root_len:], lang) for _, entry, lang in found)
+            stack.extend(reversed(subdirs))
+        return files
+
+    def _parse_file(self, fpath: str, rel_path: str, lang: str) -> ParsedFile | None:
+        """Parse a single file with tree-sitter.
+
+        Does not touch mapper state, so it can run in a worker process; the
+        result is merged with _add_parsed.
+        """
+        parser = get_parser(lang)
+        if parser is None:
+            return None
 
-    def _parse_file(self, fpath: Path, rel_path: str, lang: str):
-        """Parse a single file with tree-sitter."""
         try:
-            source = fpath.read_bytes()
+            with open(fpath, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size > self.config.max_file_bytes:
+                    # Count lines without holding the whole file in memory
+                    line_count = sum(
+                        chunk.count(b"\n") for chunk in iter(lambda: f.read(_READ_CHUNK), b"")
+                    ) + 1
+                else:
+                    source = f.read()
         except (OSError, PermissionError):
-            return
+            return None
 
-        parser = get_parser(lang)
-        if parser is None:
-            return
+        # A multi-megabyte file (usually generated or bundled) costs far more
+        # tree memory and parse time than it is worth; report it unparsed
+        if size > self.config.max_file_bytes:
+            return ParsedFile(
+                rel_path=rel_path,
+                info=FileInfo(
+                    lang=lang,
+                    classes=[],
+                    functions=[],
+                    imports=[],
+                    interfaces=[],
+                    type_aliases=[],
+                    line_count=line_count,
+                ),
+                smells=[{
+                    "type": "LARGE_FILE",
+                    "severity": "low",
+                    "file": rel_path,
+                    "line": 0,
+                    "detail": f"{line_count:,} lines, {size:,} bytes (not parsed)",
+                }],
+                function_bodies=[],
+            )
 
         try:
             tree = parser.parse(source)
         except Exception:
-            return
+            return None
 
-        self.files_parsed += 1
-        source_text = source.decode("utf-8", errors="replace")
-        line_count = source_text.count("\n") + 1
+        line_count = source.count(b"\n") + 1
+        smells: list[dict] = []
 
         # Check large file smell
         if line_count > self.config.large_file_lines:
-            self.smells.append({
+            smells.append({
                 "type": "LARGE_FILE",
                 "severity": "low",
                 "file": rel_path,
-                "line": None,
+                "line": 0,
                 "detail": f"{line_count:,} lines",
             })
 
-        node_types = LANG_NODE_TYPES.get(lang, {})
         ctx = FileContext(
             rel_path=rel_path,
             lang=lang,
-            node_types=node_types,
-            source_text=source_text,
+            source=source,
         )
 
         self._walk_tree(tree.root_node, ctx)
+        smells.extend(ctx.smells)
 
-        # Collect smells from context
-        self.smells.extend(ctx.smells)
-
-        # Collect function bodies for duplicate detection
-        self._function_bodies.extend(
-            (rel_path, name, line, src)
-            for name, line, src in ctx.function_bodies
+        return ParsedFile(
+            rel_path=rel_path,
+            info=FileInfo(
+                lang=lang,
+                classes=ctx.classes,
+                functions=ctx.functions,
+                imports=ctx.imports,
+                interfaces=ctx.interfaces,
+                type_aliases=ctx.type_aliases,
+                line_count=line_count,
+                used_words=non_import_words(source) if lang == "python" else frozenset(),
+            ),
+            smells=smells,
+            # Function bodies for duplicate detection
+            function_bodies=[
+                (rel_path, name, line, src)
+                for name, line, src in ctx.function_bodies
+            ],
         )
 
+    def _add_parsed(self, parsed: ParsedFile) -> None:
+        """Merge one file's parse results into the mapper."""
+        rel_path = parsed.rel_path
+        info = parsed.info
+        self.files_parsed += 1
+        self.smells.extend(parsed.smells)
+        self._function_bodies.extend(parsed.function_bodies)
+
         # Build import graph (Python-specific)
-        if lang == "python":
+        if info.lang == "python":
             module_name = rel_path.replace("/", ".").replace(".py", "")
-            for imp_text in ctx.imports:
+            for imp_text in info.imports:
                 parts = imp_text.split()
                 if len(parts) >= 2 and parts[0] == "from":
                     imported_module = parts[1]
@@ -653,112 +1149,110 @@ class CodebaseMapper:
                     continue
                 self.import_graph[module_name].add(imported_module)
 
-        self.file_data[rel_path] = {
-            "lang": lang,
-            "classes": ctx.classes,
-            "functions": ctx.functions,
-            "imports": ctx.imports,
-            "interfaces": ctx.interfaces,
-            "type_aliases": ctx.type_aliases,
-            "line_count": line_count,
-        }
+        self.file_data[rel_path] = info
+        self._file_blocks.pop(rel_path, None)
+        self.total_lines += info.line_count
+        self.total_classes += len(info.classes)
+        self.total_functions += len(info.functions)
+        self.lang_counts[info.lang] += 1
+        self._lang_breakdown = None
 
     def _walk_tree(self, node, ctx: FileContext):
-        """Iteratively walk the AST and dispatch to visitors."""
-        stack = [node]
-        while stack:
-            current = stack.pop()
-            for visitor in self._visitors:
-                visitor.visit(current, ctx)
-            # Push children in reverse order so leftmost child is processed first
-            stack.extend(reversed(current.children))
+        """Dispatch every node the visitors act on, in pre-order, to those visitors.
+
+        The nodes are found by one tree-sitter query per language, so the
+        traversal itself runs in C and Python only sees the matches.
+        """
+        query = self._dispatch_query(ctx.lang)
+        if query is None:
+            return
+        dispatch = self._dispatch[ctx.lang]
+        for current in preorder(QueryCursor(query).captures(node).get("n", ())):
+            for handler in dispatch[current.type]:
+                handler(current, ctx)
+
+    def _dispatch_query(self, lang: str) -> Query | None:
+        """Query capturing the language's dispatch node types, built on first use."""
+        if lang not in self._queries:
+            query = None
+            language = _LANGUAGES.get(lang)
+            if language is not None and lang in self._dispatch:
+                # Skip types this grammar does not define; the query would not compile
+                kinds = [
+                    k for k in self._dispatch[lang]
+                    if language.id_for_node_kind(k, True) is not None
+                ]
+                if kinds:
+                    query = Query(language, "[" + " ".join(f"({k})" for k in kinds) + "] @n")
+            self._queries[lang] = query
+        return self._queries[lang]
 
     def detect_circular_imports(self):
-        """Detect circular import cycles in the import graph."""
-        known_modules = set(self.import_graph.keys())
-
-        def find_cycles():
-            visited = set()
-            rec_stack = set()
-            cycles = []
-
-            def dfs(module, path):
-                visited.add(module)
-                rec_stack.add(module)
-                path.append(module)
-
-                for imported in self.import_graph.get(module, set()):
-                    matched = None
-                    for known in known_modules:
-                        if known == imported or known.endswith("." + imported):
-                            matched = known
-                            break
-                        if imported.startswith("."):
-                            base = ".".join(module.split(".")[:-1])
-                            candidate = base + imported
-                            if candidate in known_modules:
-                                matched = candidate
-                                break
-
-                    if matched:
-                        if matched in rec_stack:
-                            cycle_start = path.index(matched)
-                            cycle = path[cycle_start:] + [matched]
-                            cycles.append(cycle)
-                        elif matched not in visited:
-                            dfs(matched, path)
-
-                path.pop()
-                rec_stack.discard(module)
-
-            for module in known_modules:
-                if module not in visited:
-                    dfs(module, [])
-
-            return cycles
-
-        cycles = find_cycles()
-        seen = set()
-        for cycle in cycles:
-            key = " -> ".join(sorted(cycle[:-1]))
-            if key not in seen:
-                seen.add(key)
-                self.smells.append({
-                    "type": "CIRCULAR_IMPORT",
-                    "severity": "high",
-                    "file": cycle[0].replace(".", "/") + ".py",
-                    "line": None,
-                    "detail": " -> ".join(cycle),
-                })
+        """Detect circular imports: one smell per cycle of mutually importing modules.
 
-    def detect_unused_imports(self):
-        """Detect imported names not used in non-import source text (Python only)."""
-        for rel_path, info in self.file_data.items():
-            if info["lang"] != "python":
-                continue
-            fpath = self.root / rel_path
-            try:
-                source_text = fpath.read_text(errors="replace")
-            except (OSError, PermissionError):
+        Each strongly connected component of the import graph is reported
+        once, with its shortest cycle through the alphabetically first module.
+        """
+        known_modules = sorted(self.import_graph.keys())
+
+        # Every dotted suffix of a known module -> that module, so resolving
+        # an import is one dict lookup. Exact names win over suffix matches,
+        # and among suffix matches the alphabetically first module does.
+        by_suffix = {known: known for known in known_modules}
+        for known in known_modules:
+            parts = known.split(".")
+            for i in range(1, len(parts)):
+                by_suffix.setdefault(".".join(parts[i:]), known)
+
+        def resolve(module: str, imported: str) -> str | None:
+            if imported.startswith("."):
+                candidate = module.rpartition(".")[0] + imported
+                return candidate if candidate in self.import_graph else None
+            return by_suffix.get(imported)
+
+        graph: dict[str, list[str]] = {}
+        for module in known_modules:
+            resolved = {resolve(module, imported) for imported in self.import_graph[module]}
+            resolved.discard(None)
+            graph[module] = sorted(resolved)
+
+        cycles = []
+        for component in strongly_connected_components(graph):
+            start = min(component)
+            if len(component) == 1 and start not in graph[start]:
                 continue
+            cycles.append(shortest_cycle(start, set(component), graph))
 
-            # Build non-import source text
-            non_import_lines = []
-            for line in source_text.splitlines():
-                stripped = line.strip()
-                if not stripped.startswith(("import ", "from ")):
-                    non_import_lines.append(line)
-            non_import_text = "\n".join(non_import_lines)
+        for cycle in sorted(cycles):
+            self.smells.append({
+                "type": "CIRCULAR_IMPORT",
+                "severity": "high",
+                "file": cycle[0].replace(".", "/") + ".py",
+                "line": 0,
+                "detail": " -> ".join(cycle),
+            })
 
-            for imp_text in info["imports"]:
+    def detect_unused_imports(self):
+        """Detect imported names not used in non-import source text (Python only).
+
+        A name counts as used when it appears as a whole word outside import
+        lines, so "os" is not kept alive by "cost" or "hosts". The words are
+        collected while parsing, so no file is read a second time.
+        """
+        for rel_path, info in self.file_data.items():
+            if info.lang != "python":
+                continue
+            for imp_text in info.imports:
                 names = self._extract_imported_names(imp_text)
                 for name in names:
-                    if name and name != "*" and name not in non_import_text:
+                    # Import text over 80 characters is cut and ends in "...";
+                    # a clipped name (or the marker itself) is not checked
+                    if name.isidentifier() and name not in info.used_words:
                         self.smells.append({
                             "type": "UNUSED_IMPORT",
                             "severity": "low",
                             "file": rel_path,
-                            "line": None,
+                            "line": 0,
                             "detail": f"'{name}' appears unused",
                         })
 
@@ -814,16 +1308,17 @@ class CodebaseMapper:
             return
 
         def normalize(source: str) -> str:
-            lines = []
-            for line in source.splitlines():
-                stripped = line.strip()
-                if stripped and not stripped.startswith("#") and not stripped.startswith("//"):
-                    lines.append(stripped)
-            return "\n".join(lines)
+            return "\n".join(
+                stripped for line in source.splitlines()
+                if (stripped := line.strip()) and not stripped.startswith(("#", "//"))
+            )
 
         normalized = [(f, n, l, normalize(s)) for f, n, l, s in self._function_bodies]
         # Sort by source length for efficient length-based pre-filtering
         normalized.sort(key=lambda x: len(x[3]))
+        # Character counts per source give SequenceMatcher.quick_ratio() for
+        # any pair without building a matcher; it is an upper bound on ratio()
+        char_counts = [Counter(src) for _, _, _, src in normalized]
         found = 0
 
         for i in range(len(normalized)):
@@ -833,13 +1328,19 @@ class CodebaseMapper:
             len_a = len(src_a)
             if len_a < 40:  # Skip very short normalized sources
                 continue
+            counts_a = char_counts[i]
             for j in range(i + 1, len(normalized)):
                 file_b, name_b, line_b, src_b = normalized[j]
                 len_b = len(src_b)
                 # Length pre-filter: if lengths differ by >40%, similarity can't exceed 0.8
                 if len_b > len_a * 1.4:
                     break  # Sorted by length, so all remaining are longer
-                ratio = difflib.SequenceMatcher(None, src_a, src_b).ratio()
+                if 2.0 * (counts_a & char_counts[j]).total() / (len_a + len_b) <= 0.8:
+                    continue
+                if src_b == src_a:
+                    ratio = 1.0  # verbatim copy; no need to build a matcher
+                else:
+                    ratio = difflib.SequenceMatcher(None, src_a, src_b).ratio()
                 if ratio > 0.8:
                     self.smells.append({
                         "type": "DUPLICATE_LOGIC",
@@ -852,95 +1353,101 @@ class CodebaseMapper:
                     if found >= MAX_DUPLICATES:
                         break
 
+    def _file_block(self, rel_path: str) -> str:
+        """Format one file's entry in the structure map, reusing earlier renders."""
+        block = self._file_blocks.get(rel_path)
+        if block is not None:
+            return block
+
+        info = self.file_data[rel_path]
+        classes, interfaces, aliases = info.classes, info.interfaces, info.type_aliases
+        funcs, imports = info.functions, info.imports
+        out = [f"**{rel_path}** ({info.lang}, {info.line_count} lines)\n"]
+
+        if classes:
+            out.append(f"  - classes: {', '.join(classes)}\n")
+        if interfaces:
+            out.append(f"  - interfaces: {', '.join(interfaces)}\n")
+        if aliases:
+            out.append(f"  - types: {', '.join(aliases)}\n")
+        if funcs:
+            if len(funcs) > 20:
+                display = ", ".join(funcs[:20]) + f" ... (+{len(funcs) - 20} more)"
+            else:
+                display = ", ".join(funcs)
+            out.append(f"  - functions: {display}\n")
+        if imports:
+            seen: dict[str, None] = {}  # insertion-ordered set of module names
+            for imp in imports:
+                m = _IMPORT_HEAD_RE.match(imp)
+                if m:
+                    first, second = m.groups()
+                    mod = second if first in _IMPORT_KEYWORDS else first
+                    seen[mod.rstrip(",")] = None
+            unique_imports = list(seen)
+            if len(unique_imports) > 15:
+                display = ", ".join(unique_imports[:15]) + f" ... (+{len(unique_imports) - 15} more)"
+            else:
+                display = ", ".join(unique_imports)
+            out.append(f"  - imports: {display}\n")
+        out.append("\n")
+
+        block = self._file_blocks[rel_path] = "".join(out)
+        return block
+
     def format_output(self) -> str:
-        """Format the structural map and smell report."""
+        """Format the structural map and smell report as one string."""
+        buf = io.StringIO()
+        self.write_output(buf)
+        # Written lines are newline-terminated; the report has no final newline
+        return buf.getvalue()[:-1]
+
+    def write_output(self, out: TextIO | None = None) -> None:
+        """Write the structural map and smell report to out (default: stdout)."""
         # Filter out skipped smells
         active_smells = [
             s for s in self.smells
             if s["type"] not in self.config.skip_smells
         ]
 
-        lines = []
-        lines.append(f"# Codebase Structure ({self.files_parsed} files parsed)\n")
+        w = (sys.stdout if out is None else out).write
+        w(f"# Codebase Structure ({self.files_parsed} files parsed)\n\n")
 
         # --- Summary statistics ---
-        lang_counts: dict[str, int] = defaultdict(int)
-        total_lines = 0
-        total_classes = 0
-        total_functions = 0
-        for info in self.file_data.values():
-            lang_counts[info["lang"]] += 1
-            total_lines += info["line_count"]
-            total_classes += len(info["classes"])
-            total_functions += len(info["functions"])
-
-        severity_counts: dict[str, int] = defaultdict(int)
-        for smell in active_smells:
-            severity_counts[smell["severity"]] += 1
-
-        lang_breakdown = ", ".join(
-            f"{lang.capitalize()} ({count})"
-            for lang, count in sorted(lang_counts.items(), key=lambda x: -x[1])
-        )
+        severity_counts = Counter(smell["severity"] for smell in active_smells)
 
-        lines.append("## Summary\n")
-        lines.append(f"- **Files parsed**: {self.files_parsed}")
-        lines.append(f"- **Languages**: {lang_breakdown}")
-        lines.append(f"- **Total lines**: {total_lines:,}")
-        lines.append(f"- **Classes**: {total_classes} | **Functions**: {total_functions}")
-        smell_summary = (
-            f"{severity_counts.get('high', 0)} high, "
-            f"{severity_counts.get('medium', 0)} medium, "
-            f"{severity_counts.get('low', 0)} low"
-        )
-        lines.append(f"- **Smells**: {smell_summary}")
-        lines.append("")
+        # Depends only on lang_counts, so it is rebuilt after files are merged
+        if self._lang_breakdown is None:
+            self._lang_breakdown = ", ".join(
+                f"{lang.capitalize()} ({count})"
+                for lang, count in self.lang_counts.most_common()
+            )
+
+        w("## Summary\n\n")
+        w(f"- **Files parsed**: {self.files_parsed}\n")
+        w(f"- **Languages**: {self._lang_breakdown}\n")
+        w(f"- **Total lines**: {self.total_lines:,}\n")
+        w(f"- **Classes**: {self.total_classes} | **Functions**: {self.total_functions}\n")
+        # Counter returns 0 for severities with no smells
+        high, medium, low = (severity_counts[sev] for sev in ("high", "medium", "low"))
+        w(f"- **Smells**: {high} high, {medium} medium, {low} low\n")
+        w("\n")
 
         # --- File structure ---
         # Group files by top-level directory
         by_dir: dict[str, list[str]] = defaultdict(list)
-        for rel_path in sorted(self.file_data.keys()):
-            parts = rel_path.split("/")
-            top_dir = parts[0] if len(parts) > 1 else "."
-            by_dir[top_dir].append(rel_path)
-
-        for dir_name in sorted(by_dir.keys()):
-            lines.append(f"## {dir_name}/\n")
-            for rel_path in by_dir[dir_name]:
-                info = self.file_data[rel_path]
-                lines.append(f"**{rel_path}** ({info['lang']}, {info['line_count']} lines)")
-
-                if info["classes"]:
-                    lines.append(f"  - classes: {', '.join(info['classes'])}")
-                if info["interfaces"]:
-                    lines.append(f"  - interfaces: {', '.join(info['interfaces'])}")
-                if info["type_aliases"]:
-                    lines.append(f"  - types: {', '.join(info['type_aliases'])}")
-                if info["functions"]:
-                    funcs = info["functions"]
-                    if len(funcs) > 20:
-                        display = ", ".join(funcs[:20]) + f" ... (+{len(funcs) - 20} more)"
-                    else:
-                        display = ", ".join(funcs)
-                    lines.append(f"  - functions: {display}")
-                if info["imports"]:
-                    imp_names = []
-                    for imp in info["imports"]:
-                        parts = imp.split()
-                        if len(parts) >= 2:
-                            mod = parts[1] if parts[0] in ("import", "from", "#include") else parts[0]
-                            imp_names.append(mod.rstrip(","))
-                    unique_imports = list(dict.fromkeys(imp_names))
-                    if len(unique_imports) > 15:
-                        display = ", ".join(unique_imports[:15]) + f" ... (+{len(unique_imports) - 15} more)"
-                    else:
-                        display = ", ".join(unique_imports)
-                    lines.append(f"  - imports: {display}")
-                lines.append("")
+        for rel_path in self.file_data:
+            top_dir, sep, _ = rel_path.partition("/")
+            by_dir[top_dir if sep else "."].append(rel_path)
+
+        for dir_name in sorted(by_dir):
+            w(f"## {dir_name}/\n\n")
+            for rel_path in sorted(by_dir[dir_name]):
+                w(self._file_block(rel_path))
 
         # --- Smell report ---
         if active_smells:
-            lines.append(f"\n# Code Smells ({len(active_smells)} issues found)\n")
+            w(f"\n# Code Smells ({len(active_smells)} issues found)\n\n")
 
             severity_labels = {
                 "high": "High Priority",
@@ -948,53 +1455,82 @@ class CodebaseMapper:
                 "low": "Low Priority",
             }
 
-            by_severity: dict[str, list[dict]] = defaultdict(list)
-            for smell in active_smells:
-                by_severity[smell["severity"]].append(smell)
-
             MAX_PER_TYPE = 15  # Cap output per smell type to avoid noise
 
-            for sev in ("high", "medium", "low"):
-                items = by_severity.get(sev, [])
-                if not items:
+            # One pass buckets smells by severity and type. Entries carry their
+            # sort key (line is 0 for file-level smells) plus the smell's
+            # position, so ties keep the order the smells were found in
+            by_severity: dict[str, dict[str, list[tuple]]] = {sev: {} for sev in severity_labels}
+            for i, s in enumerate(active_smells):
+                by_type = by_severity.get(s["severity"])
+                if by_type is not None:
+                    by_type.setdefault(s["type"], []).append((s["file"], s["line"], i, s))
+
+            for sev, by_type in by_severity.items():
+                if not by_type:
                     continue
-                lines.append(f"## {severity_labels[sev]}\n")
-
-                # Group by type within severity, cap each type
-                by_type: dict[str, list[dict]] = defaultdict(list)
-                for s in sorted(items, key=lambda x: (x["file"], x.get("line") or 0)):
-                    by_type[s["type"]].append(s)
-
-                for smell_type, type_items in by_type.items():
-                    shown = type_items[:MAX_PER_TYPE]
-                    for s in shown:
-                        loc = s["file"]
-                        if s.get("line"):
-                            loc += f":{s['line']}"
-                        lines.append(f"- [{s['type']}] {loc} — {s['detail']}")
-                    if len(type_items) > MAX_PER_TYPE:
-                        lines.append(f"  ... and {len(type_items) - MAX_PER_TYPE} more {smell_type} issues")
-                lines.append("")
+                w(f"## {severity_labels[sev]}\n\n")
+
+                # Each type is sorted on its own and listed where its first
+                # smell falls in file and line order, capped per type
+                for type_items in by_type.values():
+                    type_items.sort()
+                for smell_type, type_items in sorted(by_type.items(), key=lambda t: t[1][0][:3]):
+                    w("".join(
+                        f"- [{smell_type}] {s['file']}{f':{line}' if line else ''} — {s['detail']}\n"
+                        for _, line, _, s in islice(type_items, MAX_PER_TYPE)
+                    ))
+                    overflow = len(type_items) - MAX_PER_TYPE
+                    if overflow > 0:
+                        w(f"  ... and {overflow} more {smell_type} issues\n")
+                w("\n")
         else:
-            lines.append("\n# Code Smells (0 issues found)\n")
-            lines.append("No code smells detected. Nice!\n")
+            w("\n# Code Smells (0 issues found)\n\n")
+            w("No code smells detected. Nice!\n\n")
 
-        return "\n".join(lines)
+
+# ---------------------------------------------------------------------------
+# Parallel parsing
+# ---------------------------------------------------------------------------
+
+# Below this many files a process pool costs more than it saves
+_PARALLEL_MIN_FILES = 64
+
+_WORKER_MAPPER: CodebaseMapper | None = None
+
+
+def _init_parse_worker(root: Path, config: MapperConfig) -> None:
+    """Process-pool initializer: load grammars and build this worker's mapper."""
+    global _WORKER_MAPPER
+    _load_languages()
+    _WORKER_MAPPER = CodebaseMapper(root, config)
+
+
+def _init_parse_thread() -> None:
+    """Thread-pool initializer: give this thread its own parsers."""
+    _LOCAL.parsers = {lang: Parser(language) for lang, language in _LANGUAGES.items()}
+
+
+def _parse_file_worker(job: tuple[str, str, str]) -> ParsedFile | None:
+    """Parse one (path, relative path, language) job in a worker process."""
+    return _WORKER_MAPPER._parse_file(*job)
 
 
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
 
+@lru_cache(maxsize=1)
 def get_git_head() -> str | None:
     """Get the current HEAD commit hash and subject."""
     try:
         result = subprocess.run(
             ["git", "log", "--format=%H %s", "-1"],
-            capture_output=True, text=True, timeout=5,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=5,
         )
-        if result.returncode == 0 and result.stdout.strip():
-            return result.stdout.strip()
+        head = result.stdout.decode("utf-8", "replace").strip()
+        if result.returncode == 0 and head:
+            return head
     except (subprocess.SubprocessError, FileNotFoundError):
         pass
     return None
@@ -1024,6 +1560,10 @@ def main():
         "--large-file", type=int, default=500, metavar="N",
         help="lines threshold for LARGE_FILE smell (default: 500)",
     )
+    parser.add_argument(
+        "--max-file-bytes", type=int, default=1_000_000, metavar="N",
+        help="skip AST parsing of files larger than this (default: 1000000)",
+    )
     parser.add_argument(
         "--skip-smells", type=str, default="", metavar="TYPE,TYPE",
         help="comma-separated smell types to skip (e.g. MISSING_DOCSTRING,LARGE_FILE)",
@@ -1032,6 +1572,18 @@ def main():
         "--skip-dirs", type=str, default="", metavar="dir,dir",
         help="additional directories to ignore (e.g. generated,vendor)",
     )
+    parser.add_argument(
+        "--jobs", type=int, default=0, metavar="N",
+        help="parser processes to use (default: one per CPU; 1 disables parallelism)",
+    )
+    parser.add_argument(
+        "--threads", action="store_true",
+        help="parse in threads instead of processes (--jobs defaults to 4 per CPU)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="do not read or write the parse cache in .claude/treemap-cache.sqlite",
+    )
 
     args = parser.parse_args()
 
@@ -1041,12 +1593,17 @@ def main():
         deep_nesting_levels=args.deep_nesting,
         many_params=args.many_params,
         large_file_lines=args.large_file,
+        max_file_bytes=args.max_file_bytes,
         skip_smells={s.strip() for s in args.skip_smells.split(",") if s.strip()},
         extra_ignore_dirs={d.strip() for d in args.skip_dirs.split(",") if d.strip()},
+        jobs=args.jobs,
+        threads=args.threads,
     )
 
     _load_languages()
     root = Path.cwd()
+    if not args.no_cache:
+        config.cache_path = root / ".claude" / "treemap-cache.sqlite"
 
     # Print HEAD commit info
     head = get_git_head()
@@ -1058,7 +1615,7 @@ def main():
     mapper.detect_circular_imports()
     mapper.detect_unused_imports()
     mapper.detect_duplicate_logic()
-    print(mapper.format_output())
+    mapper.write_output(sys.stdout)
 
 
 if __name__ == "__main__":
@@ -11,11 +11,22 @@ Requires: pip install tree-sitter tree-sitter-markdown
 """
 
 import argparse
+import functools
+import hashlib
+import importlib.util
+import io
+import json
+import os
 import re
 import sys
+import tempfile
+import threading
+import time
 import warnings
-from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, astuple, dataclass, field
 from pathlib import Path
+from typing import TextIO
 
 from tree_sitter import Language, Parser
 
@@ -26,44 +37,61 @@ warnings.filterwarnings("ignore", category=FutureWarning, module="tree_sitter")
 # Language loading (tree-sitter 0.25+ with individual packages)
 # ---------------------------------------------------------------------------
 
-_LANGUAGES: dict[str, Language] = {}
-_PARSERS: dict[str, Parser] = {}
+@functools.lru_cache(maxsize=None)
+def _markdown_parser() -> Parser | None:
+    """Build the tree-sitter-markdown parser on first use, or None if unavailable.
+
+    Loading is deferred so runs served from the parse cache never load the
+    grammar.
+    """
+    try:
+        import tree_sitter_markdown
+    except ImportError:
+        return None
+    try:
+        return Parser(Language(tree_sitter_markdown.language()))
+    except (AttributeError, TypeError, RuntimeError) as e:
+        print(
+            f"Warning: failed to load markdown (tree_sitter_markdown): {e}",
+            file=sys.stderr,
+        )
+        return None
 
 
-def _load_languages():
-    """Load the tree-sitter-markdown language."""
-    loaders = {
-        "markdown": ("tree_sitter_markdown", "language"),
-    }
-    for lang_name, (module_name, func_name) in loaders.items():
-        try:
-            mod = __import__(module_name)
-            lang_func = getattr(mod, func_name)
-            _LANGUAGES[lang_name] = Language(lang_func())
-        except ImportError:
-            pass
-        except (AttributeError, TypeError, RuntimeError) as e:
-            print(
-                f"Warning: failed to load {lang_name} ({module_name}): {e}",
-                file=sys.stderr,
-            )
+def _markdown_available() -> bool:
+    """Whether tree-sitter-markdown is installed, without loading it."""
+    try:
+        return importlib.util.find_spec("tree_sitter_markdown") is not None
+    except ValueError:  # a None entry in sys.modules blocks the import
+        return False
+
+
+_LOCAL = threading.local()  # per-thread parsers for parse_many
 
 
 def get_parser(lang: str) -> Parser | None:
-    """Get a parser for the given language."""
-    if lang not in _PARSERS:
-        if lang not in _LANGUAGES:
-            return None
-        p = Parser(_LANGUAGES[lang])
-        _PARSERS[lang] = p
-    return _PARSERS[lang]
+    """Get a parser for the given language (only markdown is supported).
+
+    parse_many threads get their own parser, since a Parser is not thread-safe.
+    """
+    if lang != "markdown":
+        return None
+    parser = getattr(_LOCAL, "parser", None)
+    return parser if parser is not None else _markdown_parser()
+
+
+def _init_parse_thread() -> None:
+    """Thread-pool initializer: give this thread its own markdown parser."""
+    markdown = _markdown_parser()
+    if markdown is not None:
+        _LOCAL.parser = Parser(markdown.language)
 
 
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class TechSpecConfig:
     """Configuration for tech spec parsing."""
     file_path: str = ""
@@ -75,7 +103,7 @@ class TechSpecConfig:
 # Data classes
 # ---------------------------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class HeadingNode:
     """A section heading in the tech spec hierarchy."""
     level: int
@@ -85,7 +113,7 @@ class HeadingNode:
     children: list["HeadingNode"] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class FeatureEntry:
     """A feature from the feature catalog (F-xxx)."""
     feature_id: str  # e.g. "F-001"
@@ -101,7 +129,7 @@ class FeatureEntry:
     line: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class ComponentEntry:
     """A component from the system architecture."""
     name: str
@@ -110,7 +138,7 @@ class ComponentEntry:
     line: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class TechnologyEntry:
     """A technology choice from the tech stack."""
     component: str
@@ -118,7 +146,7 @@ class TechnologyEntry:
     details: str
 
 
-@dataclass
+@dataclass(slots=True)
 class IntegrationEntry:
     """An external integration point."""
     system: str
@@ -126,14 +154,14 @@ class IntegrationEntry:
     data_exchange: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ScopeItem:
     """An in-scope or out-of-scope item."""
     description: str
     in_scope: bool = True
 
 
-@dataclass
+@dataclass(slots=True)
 class TechSpecDocument:
     """Aggregated data extracted from a tech spec document."""
     headings: list[HeadingNode] = field(default_factory=list)
@@ -199,6 +227,60 @@ EXPECTED_SECTIONS = {
 }
 
 
+# ---------------------------------------------------------------------------
+# Source text
+# ---------------------------------------------------------------------------
+
+class SpecSource:
+    """The document being parsed, with section text built once.
+
+    Several visitors read the same section; the joined text (and its
+    lowercase form) is kept per section line range for the whole parse.
+    """
+
+    def __init__(self, source: str):
+        self.data = source.encode("utf-8")  # what tree-sitter parses
+        self.lines = source.splitlines()
+        self._text: dict[tuple[int, int], str] = {}
+        self._lower: dict[tuple[int, int], str] = {}
+        self._headings: dict[int, str] = {}  # heading start byte -> title text
+
+    def text(self, node) -> str:
+        """Get a node's text, sliced from the source bytes."""
+        return self.data[node.start_byte:node.end_byte].decode("utf-8")
+
+    def heading_text(self, heading_node) -> str:
+        """Get a heading's stripped inline text; every section visitor reads it."""
+        key = heading_node.start_byte
+        text = self._headings.get(key)
+        if text is None:
+            text = ""
+            for child in heading_node.children:
+                if child.type == "inline":
+                    text = self.text(child).strip()
+            self._headings[key] = text
+        return text
+
+    def _line_range(self, section_node) -> tuple[int, int]:
+        return section_node.start_point[0], min(section_node.end_point[0] + 1, len(self.lines))
+
+    def section_text(self, section_node) -> str:
+        """Get the full text content of a section."""
+        key = self._line_range(section_node)
+        text = self._text.get(key)
+        if text is None:
+            text = self._text[key] = "\n".join(self.lines[key[0]:key[1]])
+        return text
+
+    def section_lower(self, section_node) -> str:
+        """Get the lowercased text content of a section."""
+        key = self._line_range(section_node)
+        lower = self._lower.get(key)
+        if lower is None:
+            lower = self._lower[key] = self.section_text(section_node).lower()
+        return lower
+
+
 # ---------------------------------------------------------------------------
 # Node Visitors
 # ---------------------------------------------------------------------------
@@ -206,30 +288,30 @@ EXPECTED_SECTIONS = {
 class NodeVisitor:
     """Base class for markdown AST node visitors."""
 
+    NODE_TYPE = ""  # the node type this visitor is called for
+
     def __init__(self, config: TechSpecConfig):
         self.config = config
 
-    def visit(self, node, doc: TechSpecDocument, source_lines: list[str]) -> None:
+    def visit(self, node, doc: TechSpecDocument, src: SpecSource) -> None:
         """Visit a node and optionally extract data."""
 
 
 class HeadingVisitor(NodeVisitor):
     """Builds numbered section hierarchy from atx_heading nodes."""
 
+    NODE_TYPE = "atx_heading"
+
     # Match tech spec heading numbers like "1.", "1.1", "2.1.2"
     _NUMBER_RE = re.compile(r"^(\d+(?:\.\d+)*\.?)\s+(.+)$")
 
-    def visit(self, node, doc: TechSpecDocument, source_lines: list[str]) -> None:
-        if node.type != "atx_heading":
-            return
-
+    def visit(self, node, doc: TechSpecDocument, src: SpecSource) -> None:
         level = 0
-        title_text = ""
         for child in node.children:
             if child.type.startswith("atx_h") and child.type.endswith("_marker"):
-                level = len(child.text.decode("utf-8").strip())
-            elif child.type == "inline":
-                title_text = child.text.decode("utf-8").strip()
+                # The marker type carries the level: atx_h3_marker -> 3
+                level = int(child.type[5])
+        title_text = src.heading_text(node)
 
         if not title_text or level == 0:
             return
@@ -254,31 +336,34 @@ class HeadingVisitor(NodeVisitor):
 class FeatureVisitor(NodeVisitor):
     """Extracts feature entries (F-xxx) from the feature catalog."""
 
+    NODE_TYPE = "section"
+
     # Match feature IDs like F-001, F-012
     _FEATURE_ID_RE = re.compile(r"\bF-(\d{3})\b")
+    # Feature name following the ID, e.g. "F-001: User Login"
+    _FEATURE_NAME_RE = re.compile(r"F-\d{3}[:\s]+(.+)")
+    # Table rows like "| **Category** | Auth |", one pattern per field
+    _TABLE_FIELD_RES = {
+        name: re.compile(rf"\|\s*\*?\*?{name}\*?\*?\s*\|\s*([^|]+)\s*\|", re.IGNORECASE)
+        for name in ("category", "priority", "status")
+    }
 
-    def visit(self, node, doc: TechSpecDocument, source_lines: list[str]) -> None:
-        if node.type != "section":
-            return
-
+    def visit(self, node, doc: TechSpecDocument, src: SpecSource) -> None:
         # Look for feature headings (#### F-xxx: Feature Name)
         for child in node.children:
             if child.type == "atx_heading":
-                text = ""
-                for sub in child.children:
-                    if sub.type == "inline":
-                        text = sub.text.decode("utf-8").strip()
+                text = src.heading_text(child)
 
                 match = self._FEATURE_ID_RE.search(text)
                 if match:
                     feature_id = f"F-{match.group(1)}"
                     # Extract feature name (after the ID)
-                    name_match = re.search(r"F-\d{3}[:\s]+(.+)", text)
+                    name_match = self._FEATURE_NAME_RE.search(text)
                     name = name_match.group(1).strip() if name_match else text
 
                     # Scan section content for required attributes
-                    section_text = self._get_section_text(node, source_lines)
-                    section_lower = section_text.lower()
+                    section_text = src.section_text(node)
+                    section_lower = src.section_lower(node)
 
                     feature = FeatureEntry(
                         feature_id=feature_id,
@@ -295,42 +380,39 @@ class FeatureVisitor(NodeVisitor):
                     )
                     doc.features.append(feature)
 
-    def _get_section_text(self, section_node, source_lines: list[str]) -> str:
-        """Get the full text content of a section."""
-        start = section_node.start_point[0]
-        end = min(section_node.end_point[0] + 1, len(source_lines))
-        return "\n".join(source_lines[start:end])
-
     def _extract_table_field(self, text: str, field_name: str) -> str:
         """Extract a value from a markdown table row."""
-        pattern = rf"\|\s*\*?\*?{field_name}\*?\*?\s*\|\s*([^|]+)\s*\|"
-        match = re.search(pattern, text, re.IGNORECASE)
+        match = self._TABLE_FIELD_RES[field_name].search(text)
         return match.group(1).strip() if match else ""
 
 
 class ComponentVisitor(NodeVisitor):
     """Extracts component definitions from architecture sections."""
 
-    def visit(self, node, doc: TechSpecDocument, source_lines: list[str]) -> None:
-        if node.type != "section":
-            return
+    NODE_TYPE = "section"
 
+    # Component headings: "5.2.X Name" or "6.X[.Y] Name"
+    _COMPONENT_RE = re.compile(r"^(5\.2\.\d+|6\.\d+(?:\.\d+)?)\s+(.+)")
+    _BOLD_SOURCE_LOC_RE = re.compile(r"\*\*Source Location\*\*[:\s]*`?([^`\n]+)`?", re.IGNORECASE)
+    _SOURCE_LOC_RE = re.compile(r"Source Location[:\s]*`?([^`\n]+)`?", re.IGNORECASE)
+    _PURPOSE_RE = re.compile(r"Purpose and Responsibilities?", re.IGNORECASE)
+    # The purpose text ends at a blank line, ### heading or table row
+    _PURPOSE_END = ("\n\n", "\n###", "\n|")
+
+    def visit(self, node, doc: TechSpecDocument, src: SpecSource) -> None:
         # Look for component headings (### 5.2.X ComponentName)
         for child in node.children:
             if child.type == "atx_heading":
-                text = ""
-                for sub in child.children:
-                    if sub.type == "inline":
-                        text = sub.text.decode("utf-8").strip()
+                text = src.heading_text(child)
 
                 # Check if this is in a component section (5.2.x or 6.x)
-                match = re.match(r"^(5\.2\.\d+|6\.\d+(?:\.\d+)?)\s+(.+)", text)
+                match = self._COMPONENT_RE.match(text)
                 if match:
                     section_num = match.group(1)
                     component_name = match.group(2).strip()
 
                     # Extract source location and responsibility from content
-                    section_text = self._get_section_text(node, source_lines)
+                    section_text = src.section_text(node)
                     source_loc = self._extract_source_location(section_text)
                     responsibility = self._extract_responsibility(section_text)
 
@@ -342,86 +424,100 @@ class ComponentVisitor(NodeVisitor):
                     )
                     doc.components.append(component)
 
-    def _get_section_text(self, section_node, source_lines: list[str]) -> str:
-        start = section_node.start_point[0]
-        end = min(section_node.end_point[0] + 1, len(source_lines))
-        return "\n".join(source_lines[start:end])
-
     def _extract_source_location(self, text: str) -> str:
         """Extract source location from section text."""
-        match = re.search(r"\*\*Source Location\*\*[:\s]*`?([^`\n]+)`?", text, re.IGNORECASE)
+        match = self._BOLD_SOURCE_LOC_RE.search(text)
         if not match:
-            match = re.search(r"Source Location[:\s]*`?([^`\n]+)`?", text, re.IGNORECASE)
+            match = self._SOURCE_LOC_RE.search(text)
         return match.group(1).strip() if match else ""
 
     def _extract_responsibility(self, text: str) -> str:
-        """Extract responsibility from Purpose section."""
-        match = re.search(r"Purpose and Responsibilities?\s*\n+(.+?)(?:\n\n|\n###|\n\|)", text, re.IGNORECASE | re.DOTALL)
-        if match:
-            return match.group(1).strip()[:200] + "..." if len(match.group(1)) > 200 else match.group(1).strip()
+        """Extract responsibility from Purpose section.
+
+        The text starts on a line after the "Purpose and Responsibilities"
+        header, preferring the last line start in the whitespace that follows
+        it, and is cut at the first _PURPOSE_END marker.
+        """
+        for match in self._PURPOSE_RE.finditer(text):
+            end = run_end = match.end()
+            while run_end < len(text) and text[run_end].isspace():
+                run_end += 1
+            start = text.rfind("\n", end, run_end) + 1
+            while start > end:
+                stops = [i for i in (text.find(t, start + 1) for t in self._PURPOSE_END) if i >= 0]
+                if stops:
+                    purpose = text[start:min(stops)]
+                    return purpose.strip()[:200] + "..." if len(purpose) > 200 else purpose.strip()
+                start = text.rfind("\n", end, start - 1) + 1
         return ""
 
 
 class TableVisitor(NodeVisitor):
     """Extracts technology and integration tables."""
 
-    def visit(self, node, doc: TechSpecDocument, source_lines: list[str]) -> None:
-        if node.type != "pipe_table":
-            return
+    NODE_TYPE = "pipe_table"
+
+    # Header keywords located by substring, in the first column containing them
+    _COLUMN_KEYWORDS = ("component", "technology", "system", "integration", "data", "exchange")
 
+    def visit(self, node, doc: TechSpecDocument, src: SpecSource) -> None:
         doc.tables += 1
 
-        header_cells = self._get_row_cells(node, "pipe_table_header")
+        header_cells = self._get_row_cells(node, "pipe_table_header", src)
         if not header_cells:
             return
 
         header_lower = [c.lower().strip() for c in header_cells]
+        header_set = set(header_lower)
+        columns = self._column_index(header_lower)
 
         # Detect technology tables
-        if self._is_tech_table(header_lower):
-            self._extract_tech_entries(node, header_lower, doc)
+        if self._is_tech_table(header_set):
+            columns["details"] = header_lower.index("details")
+            self._extract_tech_entries(node, columns, doc, src)
         # Detect integration tables
-        elif self._is_integration_table(header_lower):
-            self._extract_integration_entries(node, header_lower, doc)
+        elif self._is_integration_table(header_set, columns):
+            self._extract_integration_entries(node, columns, doc, src)
 
-    def _is_tech_table(self, headers: list[str]) -> bool:
-        return ("component" in headers or "technology" in headers) and "details" in headers
+    def _column_index(self, headers: list[str]) -> dict[str, int]:
+        """Map each header keyword to the first column whose header contains it."""
+        columns: dict[str, int] = {}
+        for i, h in enumerate(headers):
+            for kw in self._COLUMN_KEYWORDS:
+                if kw in h and kw not in columns:
+                    columns[kw] = i
+        return columns
+
+    def _is_tech_table(self, header_set: set[str]) -> bool:
+        return ("component" in header_set or "technology" in header_set) and "details" in header_set
 
-    def _is_integration_table(self, headers: list[str]) -> bool:
-        return ("system" in headers or "system name" in headers) and "integration" in " ".join(headers)
+    def _is_integration_table(self, header_set: set[str], columns: dict[str, int]) -> bool:
+        return ("system" in header_set or "system name" in header_set) and "integration" in columns
 
-    def _get_row_cells(self, table_node, row_type: str) -> list[str]:
+    def _get_row_cells(self, table_node, row_type: str, src: SpecSource) -> list[str]:
         for child in table_node.children:
             if child.type == row_type:
-                return self._cells_from_row(child)
+                return self._cells_from_row(child, src)
         return []
 
-    def _cells_from_row(self, row_node) -> list[str]:
+    def _cells_from_row(self, row_node, src: SpecSource) -> list[str]:
         cells = []
         for child in row_node.children:
             if child.type == "pipe_table_cell":
-                text = child.text.decode("utf-8").strip()
+                text = src.text(child).strip()
                 text = text.strip("`")
                 cells.append(text)
         return cells
 
-    def _extract_tech_entries(self, table_node, headers, doc):
-        comp_idx = -1
-        for i, h in enumerate(headers):
-            if "component" in h:
-                comp_idx = i
-                break
-        tech_idx = -1
-        for i, h in enumerate(headers):
-            if "technology" in h:
-                tech_idx = i
-                break
-        details_idx = headers.index("details") if "details" in headers else -1
+    def _extract_tech_entries(self, table_node, columns, doc, src):
+        comp_idx = columns.get("component", -1)
+        tech_idx = columns.get("technology", -1)
+        details_idx = columns.get("details", -1)
 
         for child in table_node.children:
             if child.type != "pipe_table_row":
                 continue
-            cells = self._cells_from_row(child)
+            cells = self._cells_from_row(child, src)
 
             component = cells[comp_idx].strip() if comp_idx >= 0 and len(cells) > comp_idx else ""
             technology = cells[tech_idx].strip() if tech_idx >= 0 and len(cells) > tech_idx else ""
@@ -434,27 +530,15 @@ class TableVisitor(NodeVisitor):
                     details=details,
                 ))
 
-    def _extract_integration_entries(self, table_node, headers, doc):
-        sys_idx = -1
-        for i, h in enumerate(headers):
-            if "system" in h:
-                sys_idx = i
-                break
-        int_idx = -1
-        for i, h in enumerate(headers):
-            if "integration" in h:
-                int_idx = i
-                break
-        data_idx = -1
-        for i, h in enumerate(headers):
-            if "data" in h or "exchange" in h:
-                data_idx = i
-                break
+    def _extract_integration_entries(self, table_node, columns, doc, src):
+        sys_idx = columns.get("system", -1)
+        int_idx = columns.get("integration", -1)
+        data_idx = min((columns[k] for k in ("data", "exchange") if k in columns), default=-1)
 
         for child in table_node.children:
             if child.type != "pipe_table_row":
                 continue
-            cells = self._cells_from_row(child)
+            cells = self._cells_from_row(child, src)
 
             system = cells[sys_idx].strip() if sys_idx >= 0 and len(cells) > sys_idx else ""
             int_type = cells[int_idx].strip() if int_idx >= 0 and len(cells) > int_idx else ""
@@ -471,15 +555,14 @@ class TableVisitor(NodeVisitor):
 class CodeBlockVisitor(NodeVisitor):
     """Detects mermaid diagrams and code blocks."""
 
-    def visit(self, node, doc: TechSpecDocument, source_lines: list[str]) -> None:
-        if node.type != "fenced_code_block":
-            return
+    NODE_TYPE = "fenced_code_block"
 
+    def visit(self, node, doc: TechSpecDocument, src: SpecSource) -> None:
         doc.code_blocks += 1
 
         for child in node.children:
             if child.type == "info_string":
-                lang_text = child.text.decode("utf-8").strip().lower()
+                lang_text = src.text(child).strip().lower()
                 if lang_text == "mermaid":
                     doc.mermaid_diagrams += 1
                     break
@@ -488,11 +571,12 @@ class CodeBlockVisitor(NodeVisitor):
 class ScopeVisitor(NodeVisitor):
     """Extracts in-scope/out-of-scope items from Section 1.3."""
 
-    def visit(self, node, doc: TechSpecDocument, source_lines: list[str]) -> None:
-        if node.type != "section":
-            return
+    NODE_TYPE = "section"
+
+    _SECTION_NUMBER_RE = re.compile(r"^(\d+(?:\.\d+)*)")
 
-        heading = self._get_section_heading(node)
+    def visit(self, node, doc: TechSpecDocument, src: SpecSource) -> None:
+        heading = self._get_section_heading(node, src)
         if not heading or not heading.startswith("1.3"):
             return
 
@@ -505,10 +589,7 @@ class ScopeVisitor(NodeVisitor):
         if not heading_node:
             return
 
-        title_text = ""
-        for child in heading_node.children:
-            if child.type == "inline":
-                title_text = child.text.decode("utf-8").strip().lower()
+        title_text = src.heading_text(heading_node).lower()
 
         is_in_scope = "in-scope" in title_text or "in scope" in title_text
         is_out_scope = "out-of-scope" in title_text or "out of scope" in title_text or "excluded" in title_text
@@ -525,9 +606,9 @@ class ScopeVisitor(NodeVisitor):
         start_line = heading_node.end_point[0] + 1
         end_line = node.end_point[0]
 
-        for i in range(start_line, min(end_line + 1, len(source_lines))):
-            line = source_lines[i].strip()
-            if line.startswith("- ") or line.startswith("* "):
+        for raw in src.lines[start_line:end_line + 1]:
+            line = raw.strip()
+            if line.startswith(("- ", "* ")):
                 desc = line.lstrip("-* ").strip()
                 if desc and not desc.startswith("|"):
                     doc.scope_items.append(ScopeItem(
@@ -535,15 +616,12 @@ class ScopeVisitor(NodeVisitor):
                         in_scope=is_in_scope,
                     ))
 
-    def _get_section_heading(self, section_node) -> str:
+    def _get_section_heading(self, section_node, src: SpecSource) -> str:
         for child in section_node.children:
             if child.type == "atx_heading":
-                for sub in child.children:
-                    if sub.type == "inline":
-                        text = sub.text.decode("utf-8").strip()
-                        match = re.match(r"^(\d+(?:\.\d+)*)", text)
-                        if match:
-                            return match.group(1)
+                match = self._SECTION_NUMBER_RE.match(src.heading_text(child))
+                if match:
+                    return match.group(1)
         return ""
 
 
@@ -551,9 +629,21 @@ class ScopeVisitor(NodeVisitor):
 # Parser
 # ---------------------------------------------------------------------------
 
+# Hierarchy prefixes by depth; headings nest at most six levels (# .. ######)
+_INDENTS = tuple("  " * depth for depth in range(6))
+
+
+def _trunc(text: str, limit: int) -> str:
+    """Cut text to limit characters, marking the cut with an ellipsis."""
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
 class TechSpecParser:
     """Parses a tech spec document using tree-sitter-markdown."""
 
+    # Fallback parser: ATX headings like "## 1.2 Title"
+    _HEADING_RE = re.compile(r"^(#{1,6})\s+(.+)$")
+
     def __init__(self, config: TechSpecConfig | None = None):
         self.config = config or TechSpecConfig()
         self._visitors = [
@@ -564,30 +654,74 @@ class TechSpecParser:
             CodeBlockVisitor(self.config),
             ScopeVisitor(self.config),
         ]
+        # Node type -> visit methods for it, in visitor order
+        self._dispatch: dict[str, list] = {}
+        for visitor in self._visitors:
+            self._dispatch.setdefault(visitor.NODE_TYPE, []).append(visitor.visit)
+        # (source, doc) of the last parse, returned again for the same source
+        self._last_parse: tuple[str, TechSpecDocument] | None = None
 
     def parse(self, source: str) -> TechSpecDocument:
-        """Parse a tech spec document and return extracted data."""
+        """Parse a tech spec document and return extracted data.
+
+        Parsing the same source again returns the previous result: the same
+        TechSpecDocument object, shared between callers, so treat it as
+        read-only.
+        """
+        last = self._last_parse
+        if last is not None and last[0] == source:
+            return last[1]
+        doc = self._parse_document(source)
+        self._last_parse = (source, doc)
+        return doc
+
+    def _parse_document(self, source: str) -> TechSpecDocument:
         doc = TechSpecDocument()
-        source_lines = source.splitlines()
-        doc.total_lines = len(source_lines)
+        src = SpecSource(source)
+        doc.total_lines = len(src.lines)
 
         parser = get_parser("markdown")
         if parser is None:
-            return self._fallback_parse(source, source_lines)
+            return self._fallback_parse(source, src.lines)
 
-        tree = parser.parse(source.encode("utf-8"))
-        self._walk_tree(tree.root_node, doc, source_lines)
+        tree = parser.parse(src.data)
+        self._walk_tree(tree, doc, src)
         self._build_hierarchy(doc)
 
         return doc
 
-    def _walk_tree(self, node, doc: TechSpecDocument, source_lines: list[str]) -> None:
-        for visitor in self._visitors:
-            visitor.visit(node, doc, source_lines)
-        for child in node.children:
-            self._walk_tree(child, doc, source_lines)
+    def parse_many(self, sources: list[str], workers: int | None = None) -> list[TechSpecDocument]:
+        """Parse several documents, returning results in source order."""
+        workers = workers or os.cpu_count() or 1
+        if workers > 1 and len(sources) > 1:
+            # tree-sitter releases the GIL while parsing, so threads overlap
+            with ThreadPoolExecutor(
+                max_workers=workers, initializer=_init_parse_thread
+            ) as ex:
+                # Workers skip the parse() memo so threads share no parser state
+                return list(ex.map(self._parse_document, sources))
+        return [self._parse_document(source) for source in sources]
+
+    def _walk_tree(self, tree, doc: TechSpecDocument, src: SpecSource) -> None:
+        """Visit nodes in document order, calling only the visitors for each type.
+
+        A TreeCursor moves through the tree in C without building a list of
+        children for every node.
+        """
+        dispatch = self._dispatch
+        cursor = tree.walk()
+        while True:
+            node = cursor.node
+            for visit in dispatch.get(node.type, ()):
+                visit(node, doc, src)
+            if cursor.goto_first_child():
+                continue
+            while not cursor.goto_next_sibling():
+                if not cursor.goto_parent():
+                    return
 
-    def _build_hierarchy(self, doc: TechSpecDocument) -> None:
+    @staticmethod
+    def _build_hierarchy(doc: TechSpecDocument) -> None:
         if not doc.headings:
             return
 
@@ -604,13 +738,13 @@ class TechSpecParser:
         doc = TechSpecDocument()
         doc.total_lines = len(source_lines)
 
-        heading_re = re.compile(r"^(#{1,6})\s+(.+)$")
-        number_re = re.compile(r"^(\d+(?:\.\d+)*\.?)\s+(.+)$")
-        feature_re = re.compile(r"\bF-(\d{3})\b")
+        heading_re = self._HEADING_RE
+        number_re = HeadingVisitor._NUMBER_RE
+        feature_re = FeatureVisitor._FEATURE_ID_RE
 
         for i, line in enumerate(source_lines):
-            # Headings
-            m = heading_re.match(line)
+            # Headings; most lines fail the cheaper "#" prefix test
+            m = heading_re.match(line) if line.startswith("#") else None
             if m:
                 level = len(m.group(1))
                 text = m.group(2).strip()
@@ -623,7 +757,7 @@ class TechSpecParser:
                 fm = feature_re.search(text)
                 if fm:
                     feature_id = f"F-{fm.group(1)}"
-                    name_match = re.search(r"F-\d{3}[:\s]+(.+)", text)
+                    name_match = FeatureVisitor._FEATURE_NAME_RE.search(text)
                     name = name_match.group(1).strip() if name_match else text
                     doc.features.append(FeatureEntry(
                         feature_id=feature_id,
@@ -634,14 +768,17 @@ class TechSpecParser:
                         line=i + 1,
                     ))
 
+            stripped = line.strip()
+
             # Mermaid diagrams
-            if line.strip().startswith("```mermaid"):
-                doc.mermaid_diagrams += 1
-            if line.strip().startswith("```") and not line.strip() == "```":
-                doc.code_blocks += 1
+            if stripped.startswith("```"):
+                if stripped.startswith("```mermaid"):
+                    doc.mermaid_diagrams += 1
+                if stripped != "```":
+                    doc.code_blocks += 1
 
             # Tables
-            if line.strip().startswith("|") and "|" in line[1:]:
+            elif stripped.startswith("|") and "|" in line[1:]:
                 doc.tables += 1
 
         self._build_hierarchy(doc)
@@ -649,66 +786,65 @@ class TechSpecParser:
 
     def format_output(self, doc: TechSpecDocument) -> str:
         """Format extracted data as structured markdown output."""
-        lines = []
+        buf = io.StringIO()
+        self.write_output(doc, buf)
+        # Written lines are newline-terminated; the report has no final newline
+        return buf.getvalue()[:-1]
+
+    def write_output(self, doc: TechSpecDocument, out: TextIO | None = None) -> None:
+        """Write extracted data as structured markdown to out (default: stdout)."""
+        w = (sys.stdout if out is None else out).write
 
         # --- Summary ---
-        lines.append("# Tech Spec Analysis Summary")
-        lines.append("")
-        lines.append(f"- **Total lines**: {doc.total_lines:,}")
-        lines.append(f"- **Major sections**: {doc.major_sections}")
-        lines.append(f"- **Total headings**: {len(doc.headings)}")
-        lines.append(f"- **Features (F-xxx)**: {doc.feature_count} ({doc.complete_features} complete)")
-        lines.append(f"- **Components**: {len(doc.components)}")
-        lines.append(f"- **Technology entries**: {len(doc.technologies)}")
-        lines.append(f"- **Integration points**: {len(doc.integrations)}")
-        lines.append(f"- **Scope items**: {len(doc.scope_items)} ({doc.in_scope_count} in-scope, {doc.out_scope_count} out-of-scope)")
-        lines.append(f"- **Mermaid diagrams**: {doc.mermaid_diagrams}")
-        lines.append(f"- **Code blocks**: {doc.code_blocks}")
-        lines.append(f"- **Tables**: {doc.tables}")
-        lines.append("")
+        w("# Tech Spec Analysis Summary\n")
+        w("\n")
+        w(f"- **Total lines**: {doc.total_lines:,}\n")
+        w(f"- **Major sections**: {doc.major_sections}\n")
+        w(f"- **Total headings**: {len(doc.headings)}\n")
+        w(f"- **Features (F-xxx)**: {doc.feature_count} ({doc.complete_features} complete)\n")
+        w(f"- **Components**: {len(doc.components)}\n")
+        w(f"- **Technology entries**: {len(doc.technologies)}\n")
+        w(f"- **Integration points**: {len(doc.integrations)}\n")
+        w(f"- **Scope items**: {len(doc.scope_items)} ({doc.in_scope_count} in-scope, {doc.out_scope_count} out-of-scope)\n")
+        w(f"- **Mermaid diagrams**: {doc.mermaid_diagrams}\n")
+        w(f"- **Code blocks**: {doc.code_blocks}\n")
+        w(f"- **Tables**: {doc.tables}\n")
+        w("\n")
 
         # --- Section Coverage ---
-        lines.append("## Section Coverage")
-        lines.append("")
+        w("## Section Coverage\n")
+        w("\n")
         found_sections = {h.number for h in doc.headings if h.number}
-        missing = []
-        present = []
-        for num, name in sorted(EXPECTED_SECTIONS.items()):
-            if num in found_sections:
-                present.append(f"[{num}] {name}")
-            else:
-                missing.append(f"[{num}] {name}")
+        missing = sorted(EXPECTED_SECTIONS.keys() - found_sections)
 
         if missing:
-            lines.append("### Missing Sections")
-            for s in missing:
-                lines.append(f"- {s}")
-            lines.append("")
+            w("### Missing Sections\n")
+            w("".join(f"- [{num}] {EXPECTED_SECTIONS[num]}\n" for num in missing))
+            w("\n")
 
-        lines.append(f"**Coverage**: {len(present)}/{len(EXPECTED_SECTIONS)} expected sections found")
-        lines.append("")
+        present = len(EXPECTED_SECTIONS) - len(missing)
+        w(f"**Coverage**: {present}/{len(EXPECTED_SECTIONS)} expected sections found\n")
+        w("\n")
 
         # --- Section Hierarchy ---
-        lines.append("## Section Hierarchy")
-        lines.append("")
-        top_level = [h for h in doc.headings if h.level == 1]
-        for h in top_level:
-            self._format_heading_tree(h, lines, indent=0)
-        lines.append("")
+        w("## Section Hierarchy\n")
+        w("\n")
+        self._format_heading_tree([h for h in doc.headings if h.level == 1], w)
+        w("\n")
 
         # --- Features ---
         if doc.features:
-            lines.append("## Feature Catalog")
-            lines.append("")
-            lines.append("| Feature ID | Name | Category | Priority | Status | Complete |")
-            lines.append("|------------|------|----------|----------|--------|----------|")
+            w("## Feature Catalog\n")
+            w("\n")
+            w("| Feature ID | Name | Category | Priority | Status | Complete |\n")
+            w("|------------|------|----------|----------|--------|----------|\n")
             for f in doc.features:
                 complete = "Yes" if all([
                     f.has_overview, f.has_business_value, f.has_user_benefits,
                     f.has_technical_context, f.has_dependencies
                 ]) else "Partial"
-                lines.append(f"| {f.feature_id} | {f.name[:40]}{'...' if len(f.name) > 40 else ''} | {f.category or '-'} | {f.priority or '-'} | {f.status or '-'} | {complete} |")
-            lines.append("")
+                w(f"| {f.feature_id} | {_trunc(f.name, 40)} | {f.category or '-'} | {f.priority or '-'} | {f.status or '-'} | {complete} |\n")
+            w("\n")
 
             # Feature completeness breakdown
             incomplete = [f for f in doc.features if not all([
@@ -716,8 +852,8 @@ class TechSpecParser:
                 f.has_technical_context, f.has_dependencies
             ])]
             if incomplete:
-                lines.append("### Incomplete Features")
-                lines.append("")
+                w("### Incomplete Features\n")
+                w("\n")
                 for f in incomplete:
                     missing_attrs = []
                     if not f.has_overview:
@@ -730,90 +866,259 @@ class TechSpecParser:
                         missing_attrs.append("Technical Context")
                     if not f.has_dependencies:
                         missing_attrs.append("Dependencies")
-                    lines.append(f"- **{f.feature_id}**: Missing {', '.join(missing_attrs)}")
-                lines.append("")
+                    w(f"- **{f.feature_id}**: Missing {', '.join(missing_attrs)}\n")
+                w("\n")
 
         # --- Components ---
         if doc.components:
-            lines.append("## Components")
-            lines.append("")
-            lines.append("| Component | Source Location |")
-            lines.append("|-----------|-----------------|")
+            w("## Components\n")
+            w("\n")
+            w("| Component | Source Location |\n")
+            w("|-----------|-----------------|\n")
             for c in doc.components:
-                lines.append(f"| {c.name} | `{c.source_location or 'N/A'}` |")
-            lines.append("")
+                w(f"| {c.name} | `{c.source_location or 'N/A'}` |\n")
+            w("\n")
 
         # --- Technologies ---
         if doc.technologies:
-            lines.append("## Technology Stack")
-            lines.append("")
-            lines.append("| Component | Technology | Details |")
-            lines.append("|-----------|------------|---------|")
+            w("## Technology Stack\n")
+            w("\n")
+            w("| Component | Technology | Details |\n")
+            w("|-----------|------------|---------|\n")
             for t in doc.technologies:
-                lines.append(f"| {t.component} | {t.technology} | {t.details[:50]}{'...' if len(t.details) > 50 else ''} |")
-            lines.append("")
+                w(f"| {t.component} | {t.technology} | {_trunc(t.details, 50)} |\n")
+            w("\n")
 
         # --- Integrations ---
         if doc.integrations:
-            lines.append("## Integration Points")
-            lines.append("")
-            lines.append("| System | Integration Type | Data Exchange |")
-            lines.append("|--------|------------------|---------------|")
+            w("## Integration Points\n")
+            w("\n")
+            w("| System | Integration Type | Data Exchange |\n")
+            w("|--------|------------------|---------------|\n")
             for i in doc.integrations:
-                lines.append(f"| {i.system} | {i.integration_type} | {i.data_exchange[:40]}{'...' if len(i.data_exchange) > 40 else ''} |")
-            lines.append("")
+                w(f"| {i.system} | {i.integration_type} | {_trunc(i.data_exchange, 40)} |\n")
+            w("\n")
 
         # --- Scope ---
         in_scope = [s for s in doc.scope_items if s.in_scope]
         out_scope = [s for s in doc.scope_items if not s.in_scope]
         if in_scope or out_scope:
-            lines.append("## Scope Boundaries")
-            lines.append("")
+            w("## Scope Boundaries\n")
+            w("\n")
             if in_scope:
-                lines.append("### In Scope")
+                w("### In Scope\n")
                 for s in in_scope[:10]:  # Limit to first 10
-                    lines.append(f"- {s.description[:100]}{'...' if len(s.description) > 100 else ''}")
+                    w(f"- {_trunc(s.description, 100)}\n")
                 if len(in_scope) > 10:
-                    lines.append(f"- *(+{len(in_scope) - 10} more)*")
-                lines.append("")
+                    w(f"- *(+{len(in_scope) - 10} more)*\n")
+                w("\n")
             if out_scope:
-                lines.append("### Out of Scope")
+                w("### Out of Scope\n")
                 for s in out_scope[:10]:
-                    lines.append(f"- {s.description[:100]}{'...' if len(s.description) > 100 else ''}")
+                    w(f"- {_trunc(s.description, 100)}\n")
                 if len(out_scope) > 10:
-                    lines.append(f"- *(+{len(out_scope) - 10} more)*")
-                lines.append("")
+                    w(f"- *(+{len(out_scope) - 10} more)*\n")
+                w("\n")
 
         # --- Verbose output ---
         if self.config.verbose and doc.headings:
-            lines.append("## Verbose: All Headings")
-            lines.append("")
+            w("## Verbose: All Headings\n")
+            w("\n")
             for h in doc.headings:
                 prefix = "  " * (h.level - 1)
-                lines.append(f"{prefix}- [{h.number}] {h.title} (line {h.line})")
-            lines.append("")
+                w(f"{prefix}- [{h.number}] {h.title} (line {h.line})\n")
+            w("\n")
+
+    def format_json(self, doc: TechSpecDocument) -> str:
+        """Format extracted data as one line of JSON for programmatic use.
+
+        Headings are listed flat in document order; their levels give the
+        hierarchy.
+        """
+        return json.dumps({
+            "file": self.config.file_path,
+            "total_lines": doc.total_lines,
+            "mermaid_diagrams": doc.mermaid_diagrams,
+            "code_blocks": doc.code_blocks,
+            "tables": doc.tables,
+            "headings": [
+                {"level": h.level, "number": h.number, "title": h.title, "line": h.line}
+                for h in doc.headings
+            ],
+            "features": [asdict(f) for f in doc.features],
+            "components": [asdict(c) for c in doc.components],
+            "technologies": [asdict(t) for t in doc.technologies],
+            "integrations": [asdict(i) for i in doc.integrations],
+            "scope_items": [asdict(s) for s in doc.scope_items],
+        }, ensure_ascii=False)
+
+    def _format_heading_tree(self, roots: list[HeadingNode], w) -> None:
+        """Write the heading trees depth-first, using an explicit stack."""
+        stack = [(heading, 0) for heading in reversed(roots)]
+        while stack:
+            heading, indent = stack.pop()
+            prefix = _INDENTS[indent]
+            num_str = f"[{heading.number}] " if heading.number else ""
+            w(f"{prefix}- {num_str}{heading.title} (L{heading.line})\n")
+            stack.extend((child, indent + 1) for child in reversed(heading.children))
 
-        return "\n".join(lines)
 
-    def _format_heading_tree(self, heading: HeadingNode, lines: list[str], indent: int) -> None:
-        prefix = "  " * indent
-        num_str = f"[{heading.number}] " if heading.number else ""
-        lines.append(f"{prefix}- {num_str}{heading.title} (L{heading.line})")
-        for child in heading.children:
-            self._format_heading_tree(child, lines, indent + 1)
+# ---------------------------------------------------------------------------
+# Parse cache
+# ---------------------------------------------------------------------------
+
+_CACHE_VERSION = 1
+_CACHE_TTL = 24 * 60 * 60  # seconds
+
+
+class SpecCache:
+    """On-disk cache of parsed documents keyed by content hash.
+
+    Repeat runs on an unchanged spec load the extracted data instead of
+    parsing it again. The cache lives in a per-user directory that only its
+    owner can access; if the directory is owned by someone else or open to
+    other users, the cache is not used, so nobody can plant entries that
+    would be loaded as parse results. Entries are JSON rather than pickles,
+    so even a tampered entry cannot run code. Entries older than a day are
+    deleted: get() removes an expired entry it finds, and put() sweeps other
+    expired entries and abandoned temp files.
+    """
+
+    def __init__(self, directory: Path | None = None):
+        if directory is None:
+            name = f"tech-spec-cache-{os.getuid()}" if hasattr(os, "getuid") else "tech-spec-cache"
+            directory = Path(tempfile.gettempdir()) / name
+        self.directory = directory
+        self._usable: bool | None = None
+
+    def _ready(self) -> bool:
+        """Create the directory owner-only and check that no one else controls it."""
+        if self._usable is None:
+            try:
+                self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+                st = self.directory.stat()
+                self._usable = not hasattr(os, "getuid") or (
+                    st.st_uid == os.getuid() and not st.st_mode & 0o077
+                )
+            except OSError:
+                self._usable = False
+        return self._usable
+
+    def key(self, source: str) -> str:
+        # tree-sitter and the regex fallback extract different data
+        salt = repr((_CACHE_VERSION, _markdown_available())).encode()
+        return hashlib.blake2b(salt + source.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> TechSpecDocument | None:
+        if not self._ready():
+            return None
+        path = self.directory / f"{key}.json"
+        try:
+            if time.time() - path.stat().st_mtime > _CACHE_TTL:
+                path.unlink()
+                return None
+            headings, features, components, technologies, integrations, scope_items, counts = (
+                json.loads(path.read_text(encoding="utf-8"))
+            )
+            doc = TechSpecDocument(
+                headings=[HeadingNode(*h) for h in headings],
+                features=[FeatureEntry(*f) for f in features],
+                components=[ComponentEntry(*c) for c in components],
+                technologies=[TechnologyEntry(*t) for t in technologies],
+                integrations=[IntegrationEntry(*i) for i in integrations],
+                scope_items=[ScopeItem(*s) for s in scope_items],
+            )
+            doc.mermaid_diagrams, doc.code_blocks, doc.tables, doc.total_lines = counts
+        except (OSError, ValueError, TypeError):
+            return None
+        TechSpecParser._build_hierarchy(doc)
+        return doc
+
+    def put(self, key: str, doc: TechSpecDocument) -> None:
+        # Headings are stored flat; get() rebuilds the children
+        data = json.dumps([
+            [(h.level, h.number, h.title, h.line) for h in doc.headings],
+            [astuple(f) for f in doc.features],
+            [astuple(c) for c in doc.components],
+            [astuple(t) for t in doc.technologies],
+            [astuple(i) for i in doc.integrations],
+            [astuple(s) for s in doc.scope_items],
+            [doc.mermaid_diagrams, doc.code_blocks, doc.tables, doc.total_lines],
+        ])
+        path = self.directory / f"{key}.json"
+        tmp = path.with_name(f"{key}.{os.getpid()}.tmp")
+        if not self._ready():
+            return
+        try:
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            return  # caching is best-effort
+        self._sweep()
+
+    def _sweep(self) -> None:
+        """Delete expired entries and temp files left by interrupted writes."""
+        cutoff = time.time() - _CACHE_TTL
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith((".json", ".tmp")) and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+        except OSError:
+            pass
 
 
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
 
+def _read_source(file_path: Path) -> str:
+    """Read a spec as UTF-8 in one decode, replacing invalid bytes.
+
+    Line endings are translated the way a text-mode read would, so CRLF and
+    lone CR files parse the same as before.
+    """
+    source = file_path.read_bytes().decode("utf-8", "replace")
+    if "\r" in source:
+        source = source.replace("\r\n", "\n").replace("\r", "\n")
+    return source
+
+
+def _spec_parser(file_path: Path, args: argparse.Namespace) -> TechSpecParser:
+    return TechSpecParser(TechSpecConfig(
+        file_path=str(file_path),
+        verbose=args.verbose,
+        focus=args.focus,
+    ))
+
+
+def _load_document(ts_parser: TechSpecParser, source: str, use_cache: bool) -> TechSpecDocument:
+    """Parse source, reusing the on-disk cache entry when there is one."""
+    if not use_cache:
+        return ts_parser.parse(source)
+    cache = SpecCache()
+    key = cache.key(source)
+    doc = cache.get(key)
+    if doc is None:
+        doc = ts_parser.parse(source)
+        cache.put(key, doc)
+    return doc
+
+
+def _format_file(file_path: Path, source: str, args: argparse.Namespace) -> str:
+    """Parse and format one spec; the process-pool task for several files."""
+    ts_parser = _spec_parser(file_path, args)
+    doc = _load_document(ts_parser, source, not args.no_cache)
+    return ts_parser.format_json(doc) if args.json else ts_parser.format_output(doc)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Parse and analyze Technical Specification documents.",
     )
     parser.add_argument(
-        "file", type=str,
-        help="path to the tech spec markdown file",
+        "files", type=str, nargs="+", metavar="file",
+        help="path to a tech spec markdown file (several are parsed in parallel)",
     )
     parser.add_argument(
         "--verbose", action="store_true",
@@ -823,26 +1128,52 @@ def main():
         "--focus", type=str, default="", metavar="AREA",
         help="focus review on a specific area (e.g. 'requirements', 'architecture')",
     )
-
-    args = parser.parse_args()
-
-    file_path = Path(args.file)
-    if not file_path.exists():
-        print(f"Error: {file_path} not found.", file=sys.stderr)
-        sys.exit(1)
-
-    config = TechSpecConfig(
-        file_path=str(file_path),
-        verbose=args.verbose,
-        focus=args.focus,
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="do not read or write the parsed-document cache in the temp directory",
+    )
+    parser.add_argument(
+        "--json", action="store_true",
+        help="print the extracted data as JSON, one line per file, instead of the report",
     )
 
-    _load_languages()
+    args = parser.parse_args()
 
-    source = file_path.read_text(errors="replace")
-    ts_parser = TechSpecParser(config)
-    doc = ts_parser.parse(source)
-    print(ts_parser.format_output(doc))
+    # Every file is read before any output, so a missing one fails up front
+    file_paths = [Path(f) for f in args.files]
+    sources = []
+    for file_path in file_paths:
+        try:
+            sources.append(_read_source(file_path))
+        except OSError as e:
+            print(f"Error: {file_path}: {e.strerror}", file=sys.stderr)
+            sys.exit(1)
+
+    if len(file_paths) == 1:
+        file_path = file_paths[0]
+        ts_parser = _spec_parser(file_path, args)
+        doc = _load_document(ts_parser, sources[0], not args.no_cache)
+        if args.json:
+            sys.stdout.write(ts_parser.format_json(doc) + "\n")
+        else:
+            ts_parser.write_output(doc, sys.stdout)
+        return
+
+    # Each spec is independent CPU-bound work; reports keep argument order
+    workers = min(len(file_paths), os.cpu_count() or 1)
+    task = functools.partial(_format_file, args=args)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            reports = list(ex.map(task, file_paths, sources))
+    else:
+        reports = list(map(task, file_paths, sources))
+    if args.json:
+        sys.stdout.writelines(report + "\n" for report in reports)
+        return
+    for i, (file_path, report) in enumerate(zip(file_paths, reports)):
+        if i:
+            sys.stdout.write("\n")
+        sys.stdout.write(f"# File: {file_path}\n\n{report}\n")
 
 
 if __name__ == "__main__":